@@ -1,14 +1,54 @@
 import streamlit as st
-import streamlit_authenticator as stauth
-from modules import database
+import extra_streamlit_components as stx
+from datetime import datetime, timedelta
+from modules import database, auth
 import bcrypt
 
 st.set_page_config(page_title="AI Journal Login", page_icon="🧠", layout="centered")
 
-users = database.get_all_users()
-credentials = {"usernames": {user['username']: {"name": user['username'], "password": user['password_hash'], "email": user['email']} for user in users}}
+cookie_manager = stx.CookieManager(key="ai_journal_cookies")
 
-authenticator = stauth.Authenticate(credentials, "ai_journal_cookie", "ai_journal_key", 30)
+def start_session(user):
+    st.session_state.authentication_status = True
+    st.session_state.username = user['username']
+    st.session_state.name = user['username']
+    st.session_state.user_id = user['id']
+
+def restore_session():
+    """Log in from the signed session cookie, after checking its user still exists."""
+    if not auth.sessions_enabled() or st.session_state.get("logged_out"):
+        # The browser may still send the deleted cookie on the next run
+        return
+    user = auth.read_session_token(cookie_manager.get(auth.SESSION_COOKIE_NAME))
+    if user:
+        start_session(user)
+
+def login_form():
+    """Check only the user who is logging in; the session and cookie keep the result."""
+    with st.form("Login"):
+        username = st.text_input("Username")
+        password = st.text_input("Password", type="password")
+        if st.form_submit_button("Login"):
+            try:
+                user = auth.authenticate(username, password)
+            except database.NoConnection:
+                st.error("The journal is unavailable right now. Please try again in a moment.")
+                return
+            st.session_state.authentication_status = user is not None
+            if user:
+                st.session_state.logged_out = False
+                start_session(user)
+                token = auth.make_session_token(user)
+                if token:
+                    # No rerun: the cookie is written when this run finishes rendering
+                    cookie_manager.set(auth.SESSION_COOKIE_NAME, token,
+                                       expires_at=datetime.now() + timedelta(days=auth.SESSION_COOKIE_DAYS), key="set_session")
+
+def logout():
+    cookie_manager.delete(auth.SESSION_COOKIE_NAME, key="delete_session")
+    for key in ("authentication_status", "username", "name", "user_id"):
+        st.session_state.pop(key, None)
+    st.session_state.logged_out = True
 
 st.title("🧠 AI-Powered Journal")
 st.write("Your private, intelligent space to reflect and grow.")
@@ -18,17 +58,18 @@ if st.session_state.registration_success: st.success("Registration successful! P
 st.session_state.registration_success = False
 
 if not st.session_state.get("authentication_status"):
-    authenticator.login(location="main")
+    restore_session()
+if not st.session_state.get("authentication_status"):
+    login_form()
 
 if st.session_state.get("authentication_status"):
     st.sidebar.success("Login successful!")
     st.sidebar.write(f"Welcome, *{st.session_state.name}*")
-    authenticator.logout('Logout', 'sidebar')
-    
-    user_info = database.get_user(st.session_state.username)
-    st.session_state.user_id = user_info['id']
-    
-    st.write("Please navigate to the 'Journal' page in the sidebar.")
+    if st.sidebar.button("Logout"):
+        logout()
+        st.info("You have been logged out.")
+    else:
+        st.write("Please navigate to the 'Journal' page in the sidebar.")
 
 elif st.session_state.get("authentication_status") is False:
     st.error("Username/password is incorrect")
@@ -50,6 +91,7 @@ if not st.session_state.get("authentication_status"):
                 else:
                     hashed = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
                     if database.add_user(username, email, hashed):
+                        auth.forget(username)
                         st.session_state.registration_success = True
                         st.rerun()
                     else:
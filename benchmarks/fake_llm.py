@@ -0,0 +1,72 @@
+import hashlib
+import random
+import threading
+import time
+from modules import llm_handler
+
+WORDS = (
+    "the week felt busy but steady with work deadlines gym sessions and quiet evenings "
+    "spent reading mood improved after the weekend trip family dinner and long walks "
+    "sleep was uneven stress came mostly from the project while friends and cooking helped"
+).split()
+
+class FakeLLM:
+    """Deterministic stand-in for the Groq client.
+
+    The same prompt always gets the same answer. Each call waits `latency`
+    seconds before the first token, and streamed answers then arrive at
+    `tokens_per_second` (0 sends them all at once).
+    """
+
+    def __init__(self, latency=0.0, tokens_per_second=0.0, response_tokens=150):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _answer(self, prompt, max_tokens=None):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += llm_handler.estimate_tokens(prompt)
+        if prompt.startswith("Classify the user's query"):
+            query = prompt.split("Query:", 1)[-1].lower()
+            words = ["summary" if "summar" in query or "how was" in query else "qa"]
+        else:
+            rng = random.Random(hashlib.sha256(prompt.encode('utf-8')).digest())
+            count = min(self.response_tokens, max_tokens or self.response_tokens)
+            words = [rng.choice(WORDS) for _ in range(count)]
+        with self._lock:
+            self.completion_tokens += len(words)
+        return words
+
+    def complete(self, prompt, max_tokens=None):
+        time.sleep(self.latency)
+        return " ".join(self._answer(prompt, max_tokens))
+
+    def stream_completion(self, prompt, max_tokens=None):
+        time.sleep(self.latency)
+        for i, word in enumerate(self._answer(prompt, max_tokens)):
+            if self.tokens_per_second:
+                time.sleep(1 / self.tokens_per_second)
+            yield word if i == 0 else " " + word
+
+    def get_llm_response(self, prompt):
+        return self.complete(prompt)
+
+    def stream_llm_response(self, prompt):
+        yield from self.stream_completion(prompt)
+
+    def install(self):
+        """Replace every LLM entry point in modules.llm_handler with this stub."""
+        llm_handler.complete = self.complete
+        llm_handler.stream_completion = self.stream_completion
+        llm_handler.get_llm_response = self.get_llm_response
+        llm_handler.stream_llm_response = self.stream_llm_response
+        return self
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'prompt_tokens': self.prompt_tokens, 'completion_tokens': self.completion_tokens}
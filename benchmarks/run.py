@@ -0,0 +1,222 @@
+import sys
+import os
+import argparse
+import contextlib
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(REPO_ROOT)
+
+from benchmarks import fake_llm, sqlite_database, synthetic
+from modules import database, chunking, embeddings, intent, query_logic, summarizer, vector_store
+from modules.answer_cache import answer_cache
+import faiss
+import numpy as np
+
+# Date ranges the summary context is assembled for, ending on the last journal day
+CONTEXT_SPANS = {'week': 7, 'month': 30, 'quarter': 91, 'year': 365}
+
+class Recorder:
+    """Wall-clock samples per benchmark name."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.extra = defaultdict(dict)
+
+    def time(self, name, func, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.samples[name].append(time.perf_counter() - started)
+        return result
+
+    def results(self):
+        results = {}
+        for name, samples in self.samples.items():
+            ms = np.array(samples) * 1000
+            results[name] = {
+                'calls': len(ms),
+                'total_s': round(float(ms.sum()) / 1000, 4),
+                'mean_ms': round(float(ms.mean()), 3),
+                'p50_ms': round(float(np.percentile(ms, 50)), 3),
+                'p95_ms': round(float(np.percentile(ms, 95)), 3),
+                'max_ms': round(float(ms.max()), 3),
+                **self.extra[name],
+            }
+        return results
+
+def progress(message):
+    print(message, file=sys.stderr, flush=True)
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_journals(recorder, journals):
+    """Create the users and save every entry the way the Journal page does; returns their ids."""
+    user_ids = []
+    for username, entries in journals:
+        database.add_user(username, f"{username}@example.com", "not a password hash")
+        user_id = database.get_user(username)['id']
+        for entry_date, content in entries:
+            recorder.time('ingest_entry', lambda: database.ingest_entry(user_id, entry_date, content, chunking.split_entry(content)))
+        user_ids.append(user_id)
+    return user_ids
+
+def bench_index_builds(recorder, user_ids):
+    """Build every index with a cold embedding cache, then again with a warm one."""
+    store = vector_store.get_vector_store()
+    for name in ('index_build_cold', 'index_build_warm'):
+        for user_id in user_ids:
+            recorder.time(name, store.create_index, user_id)
+    recorder.extra['index_build_cold']['vectors'] = sum(store.load_index(user_id).ntotal for user_id in user_ids)
+
+def bench_search(recorder, user_ids, end_date):
+    store = vector_store.get_vector_store()
+    month_start = end_date - timedelta(days=CONTEXT_SPANS['month'] - 1)
+    for user_id in user_ids:
+        for query in synthetic.QA_QUERIES:
+            recorder.time('vector_search', store.search, user_id, query, 5)
+            recorder.time('vector_search_month', store.search, user_id, query, 5, month_start, end_date)
+
+def bench_queries(recorder, user_ids, end_date):
+    """handle_query end to end; the answer cache is cleared so every call does the full work."""
+    month_start = end_date - timedelta(days=CONTEXT_SPANS['month'] - 1)
+    for user_id in user_ids:
+        for query in synthetic.QA_QUERIES:
+            answer_cache.invalidate_user(user_id)
+            recorder.time('handle_query_qa', query_logic.handle_query, user_id, query)
+        for query in synthetic.SUMMARY_QUERIES:
+            answer_cache.invalidate_user(user_id)
+            recorder.time('handle_query_summary', query_logic.handle_query, user_id, query, month_start, end_date)
+
+def bench_summary_context(recorder, user_ids, end_date, suffix):
+    for span, days in CONTEXT_SPANS.items():
+        start_date = end_date - timedelta(days=days - 1)
+        for user_id in user_ids:
+            recorder.time(f'summary_context_{span}{suffix}', query_logic.get_optimized_summary_context, user_id, start_date, end_date)
+
+def bench_summarizers(recorder, llm, user_ids, end_date, workers):
+    """Backfill every weekly, then monthly, summary with the rate limits lifted."""
+    limiter = summarizer.RateLimiter(requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12)
+    for kind in ('weekly', 'monthly'):
+        calls = llm.stats()['calls']
+        counts = recorder.time(f'summarizer_{kind}', summarizer.run, kind, backfill=True, workers=workers,
+                               user_ids=user_ids, today=end_date + timedelta(days=1), limiter=limiter)
+        recorder.extra[f'summarizer_{kind}'].update(saved=counts.get('saved', 0), failed=counts.get('failed', 0),
+                                                     llm_calls=llm.stats()['calls'] - calls)
+
+def compare(baseline, current):
+    """Print the mean latency change of every benchmark present in both runs."""
+    print(f"{'benchmark':<36} {'baseline ms':>12} {'current ms':>12} {'change':>8}", file=sys.stderr)
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        change = (result['mean_ms'] - before['mean_ms']) / before['mean_ms'] * 100 if before['mean_ms'] else 0.0
+        print(f"{name:<36} {before['mean_ms']:>12.2f} {result['mean_ms']:>12.2f} {change:>+7.1f}%", file=sys.stderr)
+
+def run(args, workdir):
+    os.chdir(workdir)
+    sqlite_database.install(os.path.join(workdir, "journal.db"))
+    llm = fake_llm.FakeLLM(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second).install()
+    # Background audit calls would land in random benchmarks
+    intent.INTENT_AUDIT_RATE = 0
+
+    end_date = args.end_date
+    recorder = Recorder()
+    started = time.perf_counter()
+    if recorder.time('model_load', embeddings.get_model) is None:
+        raise SystemExit("Embedding model not available.")
+
+    journals = synthetic.generate_journals(args.users, args.years, args.entries_per_week, args.entry_words, end_date, args.seed)
+    num_entries = sum(len(entries) for _, entries in journals)
+    progress(f"Saving {num_entries} entries for {args.users} users...")
+    log_path = os.path.join(workdir, "benchmark.log")
+    # What the modules print goes to the log, so stdout only carries the results
+    with open(log_path, "w") as log, contextlib.redirect_stdout(log):
+        user_ids = load_journals(recorder, journals)
+        progress("Building indexes...")
+        bench_index_builds(recorder, user_ids)
+        progress("Searching...")
+        bench_search(recorder, user_ids, end_date)
+        progress("Answering questions...")
+        bench_queries(recorder, user_ids, end_date)
+        progress("Assembling summary context...")
+        bench_summary_context(recorder, user_ids, end_date, '')
+        progress("Running the summarizers...")
+        bench_summarizers(recorder, llm, user_ids, end_date, args.summarizer_workers)
+        bench_summary_context(recorder, user_ids, end_date, '_summarized')
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'faiss': faiss.__version__,
+            'numpy': np.__version__,
+            'index_kinds': sorted({vector_store.get_index_kind(vector_store.vector_store.load_index(user_id)) for user_id in user_ids}),
+        },
+        'params': {key: str(value) if isinstance(value, date) else value for key, value in vars(args).items()
+                   if key not in ('output', 'baseline', 'workdir', 'keep')},
+        'dataset': {
+            'users': len(user_ids),
+            'entries': num_entries,
+            'chunks': sum(len(database.get_chunk_dates(user_id)) for user_id in user_ids),
+            'words': sum(len(content.split()) for _, entries in journals for _, content in entries),
+        },
+        'llm': llm.stats(),
+        'elapsed_s': round(time.perf_counter() - started, 2),
+        'results': recorder.results(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexing, search, queries and summaries on synthetic journals, without MySQL or Groq.")
+    parser.add_argument("--users", type=int, default=3, help="Number of synthetic users")
+    parser.add_argument("--years", type=float, default=2, help="Years of journal per user")
+    parser.add_argument("--entries-per-week", type=float, default=5, help="Average entries written per week")
+    parser.add_argument("--entry-words", type=int, default=250, help="Average words per entry")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=date(2024, 12, 31), help="Last journal day (YYYY-MM-DD)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic journals")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds the fake LLM takes before answering")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0, help="Streaming speed of the fake LLM (0 for instant)")
+    parser.add_argument("--summarizer-workers", type=int, default=summarizer.SUMMARIZER_WORKERS, help="Concurrent summarizer jobs")
+    parser.add_argument("--workdir", help="Directory for the SQLite file and indexes (a temporary one by default)")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary working directory")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="journal-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        results = run(args, workdir)
+    finally:
+        os.chdir(REPO_ROOT)
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+        elif os.path.isdir(workdir):
+            progress(f"Working files kept in {workdir}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        progress(f"Results written to {output}")
+    else:
+        print(json.dumps(results, indent=2))
+    if baseline:
+        with open(baseline) as f:
+            compare(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import hashlib
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+import numpy as np
+from modules import database
+
+# The tables of sql/schema.sql and sql/migrations in SQLite syntax, with the
+# same per-user indexes so the stand-in reads rows in the same order.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS daily_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    entry_date DATE NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_daily_entries_user_date ON daily_entries (user_id, entry_date);
+CREATE TABLE IF NOT EXISTS entry_chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    entry_id INTEGER NOT NULL REFERENCES daily_entries(id) ON DELETE CASCADE,
+    entry_date DATE NOT NULL,
+    chunk_text TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_entry_chunks_user_date ON entry_chunks (user_id, entry_date);
+CREATE INDEX IF NOT EXISTS idx_entry_chunks_entry ON entry_chunks (entry_id);
+CREATE TABLE IF NOT EXISTS weekly_summaries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, start_date, end_date)
+);
+CREATE INDEX IF NOT EXISTS idx_weekly_summaries_start ON weekly_summaries (start_date);
+CREATE TABLE IF NOT EXISTS monthly_summaries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    summary TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, start_date, end_date)
+);
+CREATE INDEX IF NOT EXISTS idx_monthly_summaries_start ON monthly_summaries (start_date);
+CREATE TABLE IF NOT EXISTS chat_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    query TEXT NOT NULL,
+    response TEXT NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_chat_history_user_timestamp ON chat_history (user_id, timestamp);
+CREATE TABLE IF NOT EXISTS chunk_embeddings (
+    chunk_id INTEGER NOT NULL REFERENCES entry_chunks(id) ON DELETE CASCADE,
+    model_name TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    embedding BLOB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (chunk_id, model_name)
+);
+CREATE TABLE IF NOT EXISTS intent_decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NULL REFERENCES users(id) ON DELETE CASCADE,
+    query TEXT NOT NULL,
+    local_intent TEXT NOT NULL,
+    local_confidence REAL NOT NULL,
+    local_method TEXT NOT NULL,
+    llm_intent TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS index_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    entry_id INTEGER NOT NULL REFERENCES daily_entries(id) ON DELETE CASCADE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    claimed_at TIMESTAMP NULL,
+    completed_at TIMESTAMP NULL
+);
+CREATE INDEX IF NOT EXISTS idx_index_jobs_status ON index_jobs (status, id);
+CREATE INDEX IF NOT EXISTS idx_index_jobs_user_status ON index_jobs (user_id, status);
+"""
+
+# MySQL-only syntax used by modules/database.py and its SQLite equivalent.
+# FULLTEXT MATCH ... AGAINST has none, so search_chat_history with a keyword
+# of three or more letters is not supported.
+REWRITES = [
+    (re.compile(r"NOW\(\) - INTERVAL %s SECOND"), "datetime('now', '-' || %s || ' seconds')"),
+    (re.compile(r"NOW\(\)"), "CURRENT_TIMESTAMP"),
+    (re.compile(r"\bIF\("), "IIF("),
+    (re.compile(r"\s*FOR UPDATE SKIP LOCKED"), ""),
+    (re.compile(r"INSERT IGNORE"), "INSERT OR IGNORE"),
+    (re.compile(r"CREATE TEMPORARY TABLE (\w+) AS"), r"CREATE TEMP TABLE \1 AS"),
+    (re.compile(r"DROP TEMPORARY TABLE"), "DROP TABLE"),
+    (re.compile(r"ON DUPLICATE KEY UPDATE"), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"\bVALUES\((\w+)\)"), r"excluded.\1"),
+    # SQLite does not allow parentheses around the members of a UNION
+    (re.compile(r"^\s*\(SELECT"), "SELECT * FROM (SELECT"),
+    (re.compile(r"UNION ALL\s*\(SELECT"), "UNION ALL SELECT * FROM (SELECT"),
+    (re.compile(r"%s"), "?"),
+]
+
+DATE_VALUE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+DATETIME_VALUE = re.compile(r"^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(\.\d+)?$")
+
+def to_sqlite(query):
+    for pattern, replacement in REWRITES:
+        query = pattern.sub(replacement, query)
+    return query
+
+def to_param(value):
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+def from_column(value):
+    """Dates come back as text; return them as date/datetime like mysql-connector."""
+    if isinstance(value, str):
+        if DATE_VALUE.match(value):
+            return date.fromisoformat(value)
+        if DATETIME_VALUE.match(value):
+            return datetime.fromisoformat(value)
+    return value
+
+class Cursor:
+    """mysql-connector style cursor over sqlite3, optionally returning dicts."""
+
+    def __init__(self, cursor, dictionary):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def execute(self, query, params=None):
+        self._cursor.execute(to_sqlite(query), [to_param(value) for value in params or ()])
+
+    def executemany(self, query, rows):
+        self._cursor.executemany(to_sqlite(query), [[to_param(value) for value in row] for row in rows])
+
+    def _row(self, row):
+        values = tuple(from_column(value) for value in row)
+        if not self._dictionary:
+            return values
+        return {column[0]: value for column, value in zip(self._cursor.description, values)}
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return None if row is None else self._row(row)
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+class Connection:
+    """A thread's SQLite connection, shaped like a pooled mysql-connector one.
+
+    close() only ends the checkout; the connection stays open for the thread.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False):
+        return Cursor(self._conn.cursor(), dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+class SqliteDatabase:
+    """SQLite file standing in for MySQL behind modules.database.
+
+    Every function in modules.database runs unchanged: only
+    get_db_connection is replaced, and queries are rewritten on the fly.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.close()
+
+    def get_db_connection(self, timeout=None):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA foreign_keys=ON")
+            # One process, so MySQL's named locks are always free
+            conn.create_function("GET_LOCK", 2, lambda name, timeout: 1)
+            conn.create_function("RELEASE_LOCK", 1, lambda name: 1)
+            conn.create_function("SHA2", 2, lambda text, bits: hashlib.sha256(text.encode('utf-8')).hexdigest())
+            self._local.conn = conn
+        return Connection(conn)
+
+    def install(self):
+        database.get_db_connection = self.get_db_connection
+        return self
+
+def install(path):
+    """Create (or reuse) the SQLite file at `path` and route modules.database to it."""
+    return SqliteDatabase(path).install()
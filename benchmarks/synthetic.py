@@ -0,0 +1,106 @@
+import random
+from datetime import date, timedelta
+
+# Sentence templates per theme; the placeholders are filled from the lists
+# below so entries share vocabulary the way a real journal does.
+THEMES = {
+    'work': [
+        "Spent most of the day on the {project} project with {person}.",
+        "The {project} deadline moved again, which made the afternoon stressful.",
+        "Had a long meeting about {project} and finally agreed on a plan.",
+    ],
+    'exercise': [
+        "Went {activity} in the morning and felt great afterwards.",
+        "Skipped {activity} today because my knee was sore.",
+        "Tried a new {activity} route near {place} with {person}.",
+    ],
+    'food': [
+        "Cooked {dish} for dinner and it turned out better than expected.",
+        "Had lunch at {place} with {person}; the {dish} was excellent.",
+        "Ordered {dish} and watched a film to unwind.",
+    ],
+    'family': [
+        "Called {person} and talked for an hour about the holidays.",
+        "Visited {person} at {place} and helped with the garden.",
+        "{person} came over and we played board games until late.",
+    ],
+    'mood': [
+        "Felt {feeling} most of the day without a clear reason.",
+        "Woke up {feeling} and it carried through the evening.",
+        "Overall a {feeling} day, and I slept well.",
+    ],
+    'reading': [
+        "Read a few chapters of {book} before bed.",
+        "Finished {book}; the ending surprised me.",
+        "Started {book} on the train to {place}.",
+    ],
+}
+FILLERS = {
+    'project': ["Atlas", "billing migration", "mobile app", "quarterly report", "Orion"],
+    'person': ["Sam", "Priya", "my sister", "Alex", "Mum", "Jordan", "the new manager"],
+    'activity': ["running", "cycling", "swimming", "yoga", "climbing"],
+    'place': ["the lake", "Luigi's", "the old town", "the office", "the beach", "Grandma's house"],
+    'dish': ["pasta", "ramen", "a curry", "tacos", "a mushroom risotto", "pancakes"],
+    'feeling': ["calm", "anxious", "energetic", "tired", "happy", "restless"],
+    'book': ["Dune", "a history of Rome", "Project Hail Mary", "a cookbook", "The Hobbit"],
+}
+
+# Questions answered from single entries and questions over a period
+QA_QUERIES = [
+    "What did I cook for dinner with pasta?",
+    "When did I go swimming?",
+    "Who did I have lunch with at Luigi's?",
+    "Did I finish Dune?",
+    "What happened with the Atlas project deadline?",
+    "Where did I go cycling with Sam?",
+    "What did I talk about with my sister?",
+    "When did I skip running because of my knee?",
+]
+SUMMARY_QUERIES = [
+    "Summarize my last month",
+    "How was my week?",
+    "Give me an overview of my mood lately",
+    "Recap the past few weeks",
+]
+
+def entry_text(rng, words):
+    """About `words` words of journal prose drawn from a few themes."""
+    themes = rng.sample(sorted(THEMES), k=rng.randint(2, 4))
+    sentences = []
+    count = 0
+    while count < words:
+        template = rng.choice(THEMES[rng.choice(themes)])
+        sentence = template.format(**{key: rng.choice(values) for key, values in FILLERS.items()})
+        sentences.append(sentence)
+        count += len(sentence.split())
+    # Paragraph breaks every few sentences, so the splitter sees real structure
+    paragraphs = [" ".join(sentences[i:i + 4]) for i in range(0, len(sentences), 4)]
+    return "\n\n".join(paragraphs)
+
+def generate_journal(rng, start_date, end_date, entries_per_week, words_per_entry):
+    """(entry_date, content) for every day an entry is written, oldest first.
+
+    Entry lengths vary between half and one and a half times `words_per_entry`.
+    """
+    entries = []
+    probability = min(1.0, entries_per_week / 7)
+    day = start_date
+    while day <= end_date:
+        if rng.random() < probability:
+            words = max(1, int(words_per_entry * rng.uniform(0.5, 1.5)))
+            entries.append((day, entry_text(rng, words)))
+        day += timedelta(days=1)
+    return entries
+
+def generate_journals(num_users, years, entries_per_week=5, words_per_entry=250, end_date=None, seed=0):
+    """Deterministic journals for `num_users` users covering `years` years up to `end_date`.
+
+    Returns a list of (username, entries) with entries as from generate_journal.
+    """
+    end_date = end_date or date(2024, 12, 31)
+    start_date = end_date - timedelta(days=int(365.25 * years) - 1)
+    journals = []
+    for number in range(num_users):
+        rng = random.Random(f"{seed}-{number}")
+        journals.append((f"bench_user_{number}", generate_journal(rng, start_date, end_date, entries_per_week, words_per_entry)))
+    return journals
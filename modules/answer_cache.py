@@ -0,0 +1,135 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from modules import database, embeddings
+
+load_dotenv()
+
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.92"))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+
+def normalize_query(query):
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", query.lower())).strip()
+
+class AnswerCache:
+    """Semantic cache of handle_query answers.
+
+    A stored answer is reused for a later question from the same user and
+    date range whose normalized embedding is at least `similarity` cosine
+    similar, as long as the user has written no entry or chunk since the
+    answer was produced and it is younger than the TTL.
+    """
+
+    def __init__(self, similarity=ANSWER_CACHE_SIMILARITY, ttl_seconds=ANSWER_CACHE_TTL_SECONDS, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.similarity = similarity
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._scopes = {}
+        self._order = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.expired = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _scope(user_id, start_date, end_date):
+        return (user_id, start_date, end_date)
+
+    def _remove(self, entry_id):
+        scope = self._order.pop(entry_id)
+        entries = self._scopes[scope]
+        del entries[entry_id]
+        if not entries:
+            del self._scopes[scope]
+
+    def lookup(self, user_id, query, start_date=None, end_date=None, version=None):
+        """Return a cached response for a near-duplicate question, or None.
+        
+        `version` is the user's current data version; callers that already
+        read it pass it in to save a query.
+        """
+        vector = embeddings.encode_query(normalize_query(query))
+        if vector is None:
+            return None
+        scope = self._scope(user_id, start_date, end_date)
+        if version is None:
+            with self._lock:
+                has_candidates = bool(self._scopes.get(scope))
+            # Only pay for the freshness query when there is something to serve
+            version = database.get_user_data_version(user_id) if has_candidates else None
+
+        now = time.monotonic()
+        with self._lock:
+            best_id, best_score = None, self.similarity
+            for entry_id, entry in list(self._scopes.get(scope, {}).items()):
+                if now - entry['created'] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    self.expired += 1
+                    continue
+                if entry['version'] != version:
+                    self._remove(entry_id)
+                    self.stale += 1
+                    continue
+                score = float(vector @ entry['vector'])
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._order.move_to_end(best_id)
+            self.hits += 1
+            return self._scopes[scope][best_id]['response']
+
+    def store(self, user_id, query, response, start_date=None, end_date=None, version=None):
+        """Cache a response produced against the user's data at `version`."""
+        vector = embeddings.encode_query(normalize_query(query))
+        if vector is None:
+            return
+        if version is None:
+            version = database.get_user_data_version(user_id)
+        scope = self._scope(user_id, start_date, end_date)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._scopes.setdefault(scope, {})[entry_id] = {
+                'vector': vector, 'response': response, 'version': version, 'created': time.monotonic()
+            }
+            self._order[entry_id] = scope
+            while len(self._order) > self.max_entries:
+                self._remove(next(iter(self._order)))
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        """Drop every cached answer for a user, e.g. right after they save an entry."""
+        with self._lock:
+            for entry_id, scope in list(self._order.items()):
+                if scope[0] == user_id:
+                    self._remove(entry_id)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._order),
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+# Global answer cache instance
+answer_cache = AnswerCache()
+
+def get_answer_cache():
+    """Get the global answer cache instance."""
+    return answer_cache
@@ -0,0 +1,121 @@
+import os
+import base64
+import hashlib
+import hmac
+import threading
+import time
+import bcrypt
+from dotenv import load_dotenv
+from modules import database
+
+load_dotenv()
+
+# How long a looked-up login record is reused for repeated attempts
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+# Signed session cookie that keeps a browser logged in across visits. There
+# is no default key: without one of at least SESSION_COOKIE_MIN_KEY_LENGTH
+# characters no cookie is issued or accepted, and logins last one browser session.
+SESSION_COOKIE_NAME = os.getenv("SESSION_COOKIE_NAME", "ai_journal_cookie")
+SESSION_COOKIE_KEY = os.getenv("SESSION_COOKIE_KEY", "")
+SESSION_COOKIE_DAYS = int(os.getenv("SESSION_COOKIE_DAYS", "30"))
+SESSION_COOKIE_MIN_KEY_LENGTH = 32
+
+if SESSION_COOKIE_KEY and len(SESSION_COOKIE_KEY) < SESSION_COOKIE_MIN_KEY_LENGTH:
+    print(f"SESSION_COOKIE_KEY is shorter than {SESSION_COOKIE_MIN_KEY_LENGTH} characters; session cookies are disabled.")
+
+# Checked against when the username does not exist, so a miss costs the same
+# bcrypt work as a wrong password
+_DUMMY_HASH = bcrypt.hashpw(b"not a password", bcrypt.gensalt()).decode()
+
+_cache = {}
+_lock = threading.Lock()
+
+def get_login_user(username):
+    """The users row for one username, cached for USER_CACHE_TTL_SECONDS.
+
+    Only found users are cached, so an account is usable as soon as it is
+    created. Raises database.NoConnection when the database is unreachable.
+    """
+    now = time.monotonic()
+    with _lock:
+        cached = _cache.get(username)
+        if cached and cached[0] > now:
+            return cached[1]
+    user = database.get_login_user(username)
+    if user is None:
+        return None
+    with _lock:
+        _cache[username] = (now + USER_CACHE_TTL_SECONDS, user)
+        # Drop expired records so the cache stays as small as recent traffic
+        for key in [key for key, (expires, _) in _cache.items() if expires <= now]:
+            del _cache[key]
+    return user
+
+def forget(username):
+    """Drop a cached record, e.g. right after the account is created."""
+    with _lock:
+        _cache.pop(username, None)
+
+def authenticate(username, password):
+    """Check a login. Returns {'id', 'username', 'email'} on success, else None.
+
+    Raises database.NoConnection when the database is unreachable.
+    """
+    user = get_login_user(username)
+    password_hash = user['password_hash'] if user else _DUMMY_HASH
+    if not bcrypt.checkpw(password.encode(), password_hash.encode()):
+        return None
+    if not user:
+        return None
+    return {'id': user['id'], 'username': user['username'], 'email': user['email']}
+
+# --- Session cookie ---
+def sessions_enabled():
+    """Whether a strong enough SESSION_COOKIE_KEY is configured."""
+    return len(SESSION_COOKIE_KEY) >= SESSION_COOKIE_MIN_KEY_LENGTH
+
+def _sign(payload, password_hash):
+    # Signing over the password hash revokes the cookie when the password changes
+    message = f"{payload}.{password_hash}".encode()
+    return hmac.new(SESSION_COOKIE_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+def make_session_token(user, now=None):
+    """Signed "<user id>:<expiry>:<username>" token for the session cookie.
+
+    Returns None when session cookies are disabled or the user cannot be read.
+    """
+    if not sessions_enabled():
+        return None
+    try:
+        row = get_login_user(user['username'])
+    except database.NoConnection:
+        return None
+    if row is None or row['id'] != user['id']:
+        return None
+    expires = int((now or time.time()) + SESSION_COOKIE_DAYS * 86400)
+    payload = base64.urlsafe_b64encode(f"{row['id']}:{expires}:{row['username']}".encode()).decode()
+    return f"{payload}.{_sign(payload, row['password_hash'])}"
+
+def read_session_token(token, now=None):
+    """{'id', 'username'} from a valid, unexpired token, else None.
+
+    The user is looked up again, so a deleted account or a changed password
+    invalidates the cookie (within USER_CACHE_TTL_SECONDS). An unreachable
+    database also means no session.
+    """
+    if not sessions_enabled() or not token:
+        return None
+    try:
+        payload, signature = token.rsplit(".", 1)
+        user_id, expires, username = base64.urlsafe_b64decode(payload.encode()).decode().split(":", 2)
+        if int(expires) <= (now or time.time()):
+            return None
+        row = get_login_user(username)
+    except (AttributeError, ValueError, database.NoConnection):
+        return None
+    if row is None or row['id'] != int(user_id):
+        return None
+    if not hmac.compare_digest(signature, _sign(payload, row['password_hash'])):
+        return None
+    return {'id': row['id'], 'username': row['username']}
@@ -0,0 +1,26 @@
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# Chunk sizes for indexing; entries saved in the app and rebuilt by scripts
+# must split the same way.
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+_splitter = None
+
+def get_splitter():
+    """The process-wide text splitter, created on first use."""
+    global _splitter
+    if _splitter is None:
+        _splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    return _splitter
+
+def split_entry(content):
+    """Split one entry's text into chunks."""
+    return get_splitter().split_text(content)
+
+def split_entries(entries):
+    """Chunk (entry_id, entry_date, content) tuples into (entry_id, entry_date, chunk_text) rows.
+
+    Module-level so it can run in a process pool.
+    """
+    return [(entry_id, entry_date, chunk) for entry_id, entry_date, content in entries for chunk in split_entry(content)]
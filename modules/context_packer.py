@@ -0,0 +1,146 @@
+import os
+from datetime import timedelta
+from dotenv import load_dotenv
+from modules import llm_handler
+
+load_dotenv()
+
+# Token budget for the context of a summary query, and the smallest useful
+# excerpt before days are merged into coarser weekly or monthly digests.
+SUMMARY_CONTEXT_TOKENS = int(os.getenv("SUMMARY_CONTEXT_TOKENS", "6000"))
+MIN_DIGEST_TOKENS = int(os.getenv("MIN_DIGEST_TOKENS", "40"))
+# Smallest excerpt of one day inside a digest; days that would get less are dropped
+MIN_DAY_TOKENS = int(os.getenv("MIN_DAY_TOKENS", "10"))
+# estimate_tokens is a regex approximation of the model's tokenizer, so this
+# share of the budget is held back for its error
+TOKEN_ESTIMATE_HEADROOM = float(os.getenv("TOKEN_ESTIMATE_HEADROOM", "0.1"))
+
+# Tiers from coarsest to finest
+TIERS = ('monthly', 'weekly', 'digest', 'raw')
+
+def make_piece(tier, start_date, end_date, text):
+    return {'tier': tier, 'start_date': start_date, 'end_date': end_date, 'text': text}
+
+def header(piece):
+    if piece['tier'] == 'monthly':
+        return f"--- Monthly Summary ({piece['start_date']} to {piece['end_date']}) ---"
+    if piece['tier'] == 'weekly':
+        return f"--- Weekly Summary ({piece['start_date']} to {piece['end_date']}) ---"
+    if piece['tier'] == 'digest':
+        return f"--- Entry Excerpts ({piece['start_date']} to {piece['end_date']}) ---"
+    return f"--- Raw Entry for {piece['start_date'].strftime('%Y-%m-%d')} ---"
+
+def render(pieces):
+    return "\n\n".join(f"{header(piece)}\n{piece['text']}" for piece in pieces)
+
+def piece_tokens(piece):
+    return llm_handler.estimate_tokens(piece['text'])
+
+def water_fill_cap(sizes, budget):
+    """Largest per-piece cap c with sum(min(size, c)) <= budget.
+
+    Pieces under the cap are kept whole; only the largest are truncated.
+    """
+    if sum(sizes) <= budget:
+        return max(sizes, default=0)
+    remaining = budget
+    ordered = sorted(sizes)
+    for i, size in enumerate(ordered):
+        share = remaining // (len(ordered) - i)
+        if size > share:
+            return share
+        remaining -= size
+    return ordered[-1]
+
+def day_line(day, text):
+    return f"{day['start_date'].strftime('%a %Y-%m-%d')}: {text}"
+
+def digest_text(days, cap=None):
+    """One line per day; with `cap`, the days share it and each line is cut on its own."""
+    if cap is None:
+        return "\n".join(day_line(day, day['text']) for day in days)
+    # Each line also pays for its date, newline and a possible cut marker
+    line_tokens = max(llm_handler.estimate_tokens(day_line(day, '')) + 4 for day in days)
+    fits = max(1, cap // (line_tokens + MIN_DAY_TOKENS))
+    if fits < len(days):
+        # Too many days for the cap: keep evenly spaced ones across the period
+        days = [days[i * len(days) // fits] for i in range(fits)]
+    day_cap = water_fill_cap([piece_tokens(day) for day in days], max(0, cap - line_tokens * len(days)))
+    return "\n".join(day_line(day, llm_handler.truncate_to_tokens(day['text'], day_cap)) for day in days)
+
+def cap_pieces(pieces, budget):
+    """Truncate the largest pieces so the texts fit `budget` tokens in total."""
+    if not pieces:
+        return []
+    cap = water_fill_cap([piece_tokens(piece) for piece in pieces], budget)
+    capped = []
+    for piece in pieces:
+        if 'days' in piece:
+            # Cutting a digest as one string would keep only its first days
+            capped.append(dict(piece, text=digest_text(piece['days'], cap)))
+        else:
+            capped.append(dict(piece, text=llm_handler.truncate_to_tokens(piece['text'], cap)))
+    return capped
+
+def period_start(day, period):
+    if period == 'month':
+        return day.replace(day=1)
+    return day - timedelta(days=day.weekday())
+
+def merge_digests(raw_pieces, period):
+    """Merge per-day raw pieces into one excerpt piece per week or month.
+
+    The days are kept on the piece so cap_pieces can split its share between them.
+    """
+    groups = {}
+    for piece in raw_pieces:
+        groups.setdefault(period_start(piece['start_date'], period), []).append(piece)
+    digests = []
+    for _, days in sorted(groups.items()):
+        digest = make_piece('digest', days[0]['start_date'], days[-1]['end_date'], digest_text(days))
+        digest['days'] = days
+        digests.append(digest)
+    return digests
+
+def text_budget(pieces, budget):
+    """Budget left for piece texts once headers, separators and cut markers are paid for."""
+    return budget - sum(llm_handler.estimate_tokens(header(piece)) + 8 for piece in pieces)
+
+def pack(pieces, budget=None):
+    """Fit summary-context pieces into a token budget, returning the pieces to use.
+    
+    `pieces` should already use the coarsest tier available for each
+    sub-range. If they do not fit, raw days are cut down first. They become
+    truncated per-day excerpts, then weekly and finally monthly excerpt
+    digests once a piece would get fewer than MIN_DIGEST_TOKENS. Summaries
+    are only truncated when even monthly digests leave no room.
+
+    Token counts are estimates, so TOKEN_ESTIMATE_HEADROOM of the budget is
+    left unused rather than risk overrunning the model's context.
+    """
+    budget = int((budget or SUMMARY_CONTEXT_TOKENS) * (1 - TOKEN_ESTIMATE_HEADROOM))
+    summaries = [piece for piece in pieces if piece['tier'] in ('monthly', 'weekly')]
+    raw = [piece for piece in pieces if piece['tier'] not in ('monthly', 'weekly')]
+    summary_tokens = sum(piece_tokens(piece) for piece in summaries)
+
+    packed = None
+    for candidate in (raw, merge_digests(raw, 'week'), merge_digests(raw, 'month')):
+        available = text_budget(summaries + candidate, budget) - summary_tokens
+        if sum(piece_tokens(piece) for piece in candidate) <= available:
+            packed = summaries + candidate
+            break
+        if candidate and available >= MIN_DIGEST_TOKENS * len(candidate):
+            packed = summaries + cap_pieces(candidate, available)
+            break
+    if packed is None:
+        # Summaries alone exceed the budget: every piece gets a share
+        packed = summaries + merge_digests(raw, 'month')
+        packed = cap_pieces(packed, max(0, text_budget(packed, budget)))
+
+    return sorted(packed, key=lambda piece: (piece['start_date'], TIERS.index(piece['tier'])))
+
+def pack_context(pieces, budget=None):
+    """Packed, rendered context string, or None when there are no pieces."""
+    if not pieces:
+        return None
+    return render(pack(pieces, budget))
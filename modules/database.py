@@ -1,323 +1,727 @@
 import mysql.connector
-from mysql.connector import pooling
+from mysql.connector import errors, pooling
+import functools
 import os
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Rows per page for the paginated reads behind the Streamlit pages
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "20"))
+
+# Connections shared by all sessions of the app (mysql-connector allows up to
+# 32), and how long a caller waits for one when they are all checked out.
+MYSQL_POOL_SIZE = min(int(os.getenv("MYSQL_POOL_SIZE", "5")), pooling.CNX_POOL_MAXSIZE)
+MYSQL_POOL_TIMEOUT = float(os.getenv("MYSQL_POOL_TIMEOUT", "5"))
+
 # --- Database Connection Pool ---
-try:
-    db_pool = pooling.MySQLConnectionPool(pool_name="journal_pool", pool_size=5, host=os.getenv("MYSQL_HOST"), user=os.getenv("MYSQL_USER"), password=os.getenv("MYSQL_PASSWORD"), database=os.getenv("MYSQL_DATABASE"))
-except mysql.connector.Error as err:
-    print(f"Error creating connection pool: {err}")
-    db_pool = None
-
-def get_db_connection():
-    if db_pool is None: return None
+# Created on first use, so processes that import this module without
+# querying (e.g. embedding workers) never open connections.
+db_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    global db_pool
+    if db_pool is None:
+        with _pool_lock:
+            if db_pool is None:
+                try:
+                    db_pool = pooling.MySQLConnectionPool(pool_name="journal_pool", pool_size=MYSQL_POOL_SIZE, host=os.getenv("MYSQL_HOST"), user=os.getenv("MYSQL_USER"), password=os.getenv("MYSQL_PASSWORD"), database=os.getenv("MYSQL_DATABASE"))
+                except mysql.connector.Error as err:
+                    print(f"Error creating connection pool: {err}")
+                    return None
+    return db_pool
+
+class PoolMetrics:
+    """Checkout waits, connections in use and per-function latency, for sizing the pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.functions = {}
+
+    def checked_out(self, waited):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def timed_out(self, waited):
+        with self._lock:
+            self.timeouts += 1
+            self.wait_max = max(self.wait_max, waited)
+
+    def returned(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def record_call(self, name, elapsed):
+        with self._lock:
+            calls, total, slowest = self.functions.get(name, (0, 0.0, 0.0))
+            self.functions[name] = (calls + 1, total + elapsed, max(slowest, elapsed))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'pool_size': MYSQL_POOL_SIZE,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': 1000 * self.wait_total / self.checkouts if self.checkouts else 0.0,
+                'wait_max_ms': 1000 * self.wait_max,
+                'functions': {
+                    name: {'calls': calls, 'avg_ms': 1000 * total / calls, 'max_ms': 1000 * slowest}
+                    for name, (calls, total, slowest) in sorted(self.functions.items())
+                },
+            }
+
+pool_metrics = PoolMetrics()
+
+def get_pool_metrics():
+    """Snapshot of the pool gauges and per-function query latency."""
+    return pool_metrics.snapshot()
+
+def get_db_connection(timeout=None):
+    """Check a connection out of the pool, waiting up to `timeout` seconds
+    (MYSQL_POOL_TIMEOUT by default) while every connection is in use."""
+    pool = get_pool()
+    if pool is None: return None
+    timeout = MYSQL_POOL_TIMEOUT if timeout is None else timeout
+    started = time.monotonic()
+    delay = 0.005
+    while True:
+        try:
+            return pool.get_connection()
+        except errors.PoolError as err:
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                print(f"Error getting connection from pool: {err}")
+                return None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.1)
+        except mysql.connector.Error as err:
+            print(f"Error getting connection from pool: {err}")
+            return None
+
+class NoConnection(Exception):
+    """No pooled connection could be checked out."""
+
+@contextmanager
+def db_cursor(dictionary=False, commit=False):
+    """Check out a connection and yield a cursor on it.
+
+    With commit=True the work is committed when the block exits and rolled
+    back if it raises. The cursor and connection are always returned to the
+    pool. Raises NoConnection when the pool has none to give.
+    """
+    started = time.monotonic()
+    conn = get_db_connection()
+    if not conn:
+        pool_metrics.timed_out(time.monotonic() - started)
+        raise NoConnection()
+    pool_metrics.checked_out(time.monotonic() - started)
+    cursor = None
     try:
-        return db_pool.get_connection()
-    except mysql.connector.Error as err:
-        print(f"Error getting connection from pool: {err}")
-        return None
+        cursor = conn.cursor(dictionary=dictionary)
+        yield cursor
+        if commit:
+            conn.commit()
+    except BaseException:
+        if commit and conn.is_connected():
+            conn.rollback()
+        raise
+    finally:
+        pool_metrics.returned()
+        if cursor and conn.is_connected(): cursor.close()
+        conn.close()
+
+def db_function(default=None):
+    """Time calls to a database function and return `default` (called if
+    callable) when no connection is available."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.monotonic()
+            try:
+                return func(*args, **kwargs)
+            except NoConnection:
+                return default() if callable(default) else default
+            finally:
+                pool_metrics.record_call(func.__name__, time.monotonic() - started)
+        return wrapper
+    return decorator
 
 # --- User Management ---
+@db_function(default=False)
 def add_user(username, email, password_hash):
-    conn = get_db_connection()
-    if not conn: return False
-    cursor = None
     try:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)", (username, email, password_hash))
-        conn.commit()
+        with db_cursor(commit=True) as cursor:
+            cursor.execute("INSERT INTO users (username, email, password_hash) VALUES (%s, %s, %s)", (username, email, password_hash))
         return True
     except mysql.connector.Error as err:
         return False
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
 
+@db_function()
 def get_user(username):
-    conn = get_db_connection()
-    if not conn: return None
-    cursor = None
-    user = None
-    try:
-        cursor = conn.cursor(dictionary=True)
+    with db_cursor(dictionary=True) as cursor:
         cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-        user = cursor.fetchone()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return user
+        return cursor.fetchone()
 
+def get_login_user(username):
+    """Like get_user, but raises NoConnection instead of returning None, so a
+    login can tell an unknown name from an unreachable database."""
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
+        return cursor.fetchone()
+
+@db_function()
 def get_user_by_email(email):
-    conn = get_db_connection()
-    if not conn: return None
-    cursor = None
-    user = None
-    try:
-        cursor = conn.cursor(dictionary=True)
+    with db_cursor(dictionary=True) as cursor:
         cursor.execute("SELECT * FROM users WHERE email = %s", (email,))
-        user = cursor.fetchone()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return user
+        return cursor.fetchone()
 
+@db_function(default=list)
 def get_all_users():
-    conn = get_db_connection()
-    if not conn: return []
-    cursor = None
-    users = []
-    try:
-        cursor = conn.cursor(dictionary=True)
+    with db_cursor(dictionary=True) as cursor:
         cursor.execute("SELECT id, username, email, password_hash FROM users")
-        users = cursor.fetchall()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return users
+        return cursor.fetchall()
 
 # --- User-Specific Data Operations ---
+@db_function()
 def save_daily_entry(user_id, date, content):
-    conn = get_db_connection()
-    if not conn: return None
-    cursor = None
-    entry_id = None
-    try:
-        cursor = conn.cursor()
+    with db_cursor(commit=True) as cursor:
         cursor.execute("INSERT INTO daily_entries (user_id, entry_date, content) VALUES (%s, %s, %s)", (user_id, date, content))
-        entry_id = cursor.lastrowid
-        conn.commit()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return entry_id
+        return cursor.lastrowid
 
+@db_function(default=False)
 def save_entry_chunks(user_id, entry_id, entry_date, chunks):
-    conn = get_db_connection()
-    if not conn: return False
-    cursor = None
     try:
-        cursor = conn.cursor()
-        chunk_data = [(user_id, entry_id, entry_date, chunk) for chunk in chunks]
-        cursor.executemany("INSERT INTO entry_chunks (user_id, entry_id, entry_date, chunk_text) VALUES (%s, %s, %s, %s)", chunk_data)
-        conn.commit()
+        with db_cursor(commit=True) as cursor:
+            chunk_data = [(user_id, entry_id, entry_date, chunk) for chunk in chunks]
+            cursor.executemany("INSERT INTO entry_chunks (user_id, entry_id, entry_date, chunk_text) VALUES (%s, %s, %s, %s)", chunk_data)
         return True
     except mysql.connector.Error as err:
         return False
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
 
-def get_all_chunks(user_id):
-    conn = get_db_connection()
-    if not conn: return []
-    cursor = None
-    chunks = []
+@db_function()
+def ingest_entry(user_id, date, content, chunks):
+    """Insert an entry, its chunks and an index job in one transaction.
+
+    Chunks go in as a single multi-row INSERT. The index_jobs row is the
+    outbox for scripts/index_worker.py, so the entry is only ever committed
+    together with the job that will index it. Returns the entry id, or None
+    if anything failed and was rolled back.
+    """
     try:
-        cursor = conn.cursor(dictionary=True)
+        with db_cursor(commit=True) as cursor:
+            cursor.execute("INSERT INTO daily_entries (user_id, entry_date, content) VALUES (%s, %s, %s)", (user_id, date, content))
+            entry_id = cursor.lastrowid
+            if chunks:
+                placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(chunks))
+                params = [value for chunk in chunks for value in (user_id, entry_id, date, chunk)]
+                cursor.execute(f"INSERT INTO entry_chunks (user_id, entry_id, entry_date, chunk_text) VALUES {placeholders}", params)
+            cursor.execute("INSERT INTO index_jobs (user_id, entry_id) VALUES (%s, %s)", (user_id, entry_id))
+        return entry_id
+    except mysql.connector.Error as err:
+        print(f"Error ingesting entry: {err}")
+        return None
+
+@db_function()
+def replace_user_chunks(user_id, chunk_batches):
+    """Replace all of a user's chunks in one transaction.
+
+    `chunk_batches` yields lists of (entry_id, entry_date, chunk_text); each
+    list goes in as one multi-row INSERT, so only one batch is held at a time.
+    Cached embeddings survive the replacement: they are set aside by text
+    hash before the delete cascades, and attached to every new chunk with
+    the same text. Returns the number of chunks inserted, or None if the
+    work was rolled back.
+    """
+    try:
+        with db_cursor(commit=True) as cursor:
+            cursor.execute("DROP TEMPORARY TABLE IF EXISTS reused_embeddings")
+            cursor.execute("CREATE TEMPORARY TABLE reused_embeddings AS "
+                           "SELECT DISTINCT e.model_name, e.text_hash, e.embedding FROM chunk_embeddings e "
+                           "JOIN entry_chunks c ON c.id = e.chunk_id WHERE c.user_id = %s", (user_id,))
+            cursor.execute("DELETE FROM entry_chunks WHERE user_id = %s", (user_id,))
+            inserted = 0
+            for batch in chunk_batches:
+                if not batch: continue
+                placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(batch))
+                params = [value for entry_id, entry_date, chunk in batch for value in (user_id, entry_id, entry_date, chunk)]
+                cursor.execute(f"INSERT INTO entry_chunks (user_id, entry_id, entry_date, chunk_text) VALUES {placeholders}", params)
+                inserted += len(batch)
+            # SHA2(text, 256) is embedding_cache.text_hash; a mismatch only costs a re-encode
+            cursor.execute("INSERT IGNORE INTO chunk_embeddings (chunk_id, model_name, text_hash, embedding) "
+                           "SELECT c.id, r.model_name, r.text_hash, r.embedding FROM entry_chunks c "
+                           "JOIN reused_embeddings r ON r.text_hash = SHA2(c.chunk_text, 256) WHERE c.user_id = %s", (user_id,))
+            cursor.execute("DROP TEMPORARY TABLE reused_embeddings")
+        return inserted
+    except mysql.connector.Error as err:
+        print(f"Error replacing chunks for user {user_id}: {err}")
+        return None
+
+@db_function(default=list)
+def get_entry_chunks(user_id, entry_id):
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT id, entry_date, chunk_text FROM entry_chunks WHERE user_id = %s AND entry_id = %s ORDER BY id", (user_id, entry_id))
+        return cursor.fetchall()
+
+@db_function(default=list)
+def get_all_chunks(user_id):
+    with db_cursor(dictionary=True) as cursor:
         cursor.execute("SELECT id, chunk_text FROM entry_chunks WHERE user_id = %s", (user_id,))
-        chunks = cursor.fetchall()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return chunks
+        return cursor.fetchall()
 
-def get_chunks_by_ids(user_id, chunk_ids):
-    if not chunk_ids: return []
-    conn = get_db_connection()
-    if not conn: return []
-    cursor = None
-    chunks = []
+@db_function(default=list)
+def get_chunks_page(user_id, limit=PAGE_SIZE, after_id=None):
+    """Up to `limit` of a user's chunks with id above `after_id`, in id order."""
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT id, entry_date, chunk_text FROM entry_chunks WHERE user_id = %s AND id > %s ORDER BY id LIMIT %s",
+                       (user_id, after_id or 0, limit))
+        return cursor.fetchall()
+
+def iter_chunks(user_id, batch_size=1000):
+    """Yield a user's chunks in id order, one batch in memory at a time."""
+    after_id = None
+    while True:
+        rows = get_chunks_page(user_id, batch_size, after_id)
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1]['id']
+
+@db_function(default=list)
+def get_chunks_with_embeddings(user_id, model_name):
+    with db_cursor(dictionary=True) as cursor:
+        query = ("SELECT c.id, c.entry_date, c.chunk_text, e.text_hash, e.embedding FROM entry_chunks c "
+                 "LEFT JOIN chunk_embeddings e ON e.chunk_id = c.id AND e.model_name = %s "
+                 "WHERE c.user_id = %s ORDER BY c.id")
+        cursor.execute(query, (model_name, user_id))
+        return cursor.fetchall()
+
+@db_function(default=list)
+def get_chunk_dates(user_id):
+    """(id, entry_date) of every chunk a user has, for the vector index date sidecar."""
+    with db_cursor() as cursor:
+        cursor.execute("SELECT id, entry_date FROM entry_chunks WHERE user_id = %s", (user_id,))
+        return cursor.fetchall()
+
+@db_function(default=dict)
+def get_chunk_embeddings(chunk_ids, model_name):
+    if not chunk_ids: return {}
+    with db_cursor(dictionary=True) as cursor:
+        placeholders = ','.join(['%s'] * len(chunk_ids))
+        query = f"SELECT chunk_id, text_hash, embedding FROM chunk_embeddings WHERE model_name = %s AND chunk_id IN ({placeholders})"
+        cursor.execute(query, (model_name, *chunk_ids))
+        return {row['chunk_id']: row for row in cursor.fetchall()}
+
+@db_function(default=False)
+def save_chunk_embeddings(model_name, rows):
+    """Upsert (chunk_id, text_hash, embedding_bytes) rows for a model."""
+    if not rows: return True
     try:
-        cursor = conn.cursor(dictionary=True)
+        with db_cursor(commit=True) as cursor:
+            data = [(chunk_id, model_name, text_hash, embedding) for chunk_id, text_hash, embedding in rows]
+            cursor.executemany("INSERT INTO chunk_embeddings (chunk_id, model_name, text_hash, embedding) VALUES (%s, %s, %s, %s) "
+                               "ON DUPLICATE KEY UPDATE text_hash = VALUES(text_hash), embedding = VALUES(embedding)", data)
+        return True
+    except mysql.connector.Error as err:
+        return False
+
+@db_function(default=list)
+def get_chunk_rows_by_ids(user_id, chunk_ids):
+    if not chunk_ids: return []
+    with db_cursor(dictionary=True) as cursor:
         placeholders = ','.join(['%s'] * len(chunk_ids))
-        query = f"SELECT chunk_text FROM entry_chunks WHERE user_id = %s AND id IN ({placeholders})"
+        query = f"SELECT id, entry_date, chunk_text FROM entry_chunks WHERE user_id = %s AND id IN ({placeholders})"
         cursor.execute(query, (user_id, *chunk_ids))
-        chunks = [row['chunk_text'] for row in cursor.fetchall()]
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return chunks
+        return cursor.fetchall()
+
+def get_chunks_by_ids(user_id, chunk_ids):
+    """Chunk texts for the given ids, in the order the ids were given."""
+    rows = {row['id']: row['chunk_text'] for row in get_chunk_rows_by_ids(user_id, chunk_ids)}
+    return [rows[chunk_id] for chunk_id in chunk_ids if chunk_id in rows]
 
+@db_function(default=list)
 def get_chunks_for_dates(user_id, dates):
     if not dates: return []
-    conn = get_db_connection()
-    if not conn: return []
-    cursor = None
-    chunks = []
-    try:
-        cursor = conn.cursor(dictionary=True)
+    with db_cursor(dictionary=True) as cursor:
         placeholders = ','.join(['%s'] * len(dates))
         query = f"SELECT entry_date, chunk_text FROM entry_chunks WHERE user_id = %s AND entry_date IN ({placeholders}) ORDER BY entry_date"
         cursor.execute(query, (user_id, *dates))
-        chunks = cursor.fetchall()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return chunks
+        return cursor.fetchall()
+
+@db_function(default=list)
+def get_summary_context_rows(user_id, start_date, end_date):
+    """Monthly summaries, weekly summaries and uncovered chunks for a range, in one query.
 
+    Rows are dicts with tier ('monthly', 'weekly' or 'chunk'), start_date,
+    end_date and text. Chunks on days covered by any summary are excluded in
+    SQL with range predicates, so no per-day date list is built or sent.
+    """
+    with db_cursor(dictionary=True) as cursor:
+        query = (
+            "(SELECT 'monthly' AS tier, id, start_date, end_date, summary AS text FROM monthly_summaries "
+            " WHERE user_id = %s AND start_date <= %s AND end_date >= %s) "
+            "UNION ALL "
+            "(SELECT 'weekly' AS tier, id, start_date, end_date, summary AS text FROM weekly_summaries "
+            " WHERE user_id = %s AND start_date <= %s AND end_date >= %s) "
+            "UNION ALL "
+            "(SELECT 'chunk' AS tier, c.id, c.entry_date AS start_date, c.entry_date AS end_date, c.chunk_text AS text FROM entry_chunks c "
+            " WHERE c.user_id = %s AND c.entry_date BETWEEN %s AND %s "
+            " AND NOT EXISTS (SELECT 1 FROM monthly_summaries m WHERE m.user_id = c.user_id AND c.entry_date BETWEEN m.start_date AND m.end_date) "
+            " AND NOT EXISTS (SELECT 1 FROM weekly_summaries w WHERE w.user_id = c.user_id AND c.entry_date BETWEEN w.start_date AND w.end_date)) "
+            "ORDER BY start_date, id"
+        )
+        cursor.execute(query, (user_id, end_date, start_date, user_id, end_date, start_date, user_id, start_date, end_date))
+        return cursor.fetchall()
+
+@db_function(default=list)
 def get_all_entries(user_id):
-    conn = get_db_connection()
-    if not conn: return []
-    cursor = None
-    entries = []
-    try:
-        cursor = conn.cursor(dictionary=True)
+    with db_cursor(dictionary=True) as cursor:
         cursor.execute("SELECT * FROM daily_entries WHERE user_id = %s ORDER BY entry_date DESC", (user_id,))
-        entries = cursor.fetchall()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return entries
+        return cursor.fetchall()
 
+@db_function(default=list)
 def get_entries_in_range(user_id, start_date, end_date):
-    conn = get_db_connection()
-    if not conn: return []
-    cursor = None
-    entries = []
-    try:
-        cursor = conn.cursor(dictionary=True)
+    with db_cursor(dictionary=True) as cursor:
         cursor.execute("SELECT * FROM daily_entries WHERE user_id = %s AND entry_date BETWEEN %s AND %s ORDER BY entry_date", (user_id, start_date, end_date))
-        entries = cursor.fetchall()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return entries
+        return cursor.fetchall()
 
-def get_weekly_summaries(user_id):
-    conn = get_db_connection()
-    if not conn: return []
+def _fetch_page(query, params, limit, cursor_columns):
+    """Run a keyset query with LIMIT limit + 1; return (rows, next_cursor).
+
+    next_cursor holds the `cursor_columns` values of the last row returned,
+    or None when there are no more rows.
+    """
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute(query, params + (limit + 1,))
+        rows = cursor.fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, tuple(rows[-1][column] for column in cursor_columns)
+
+@db_function(default=lambda: ([], None))
+def get_entries_page(user_id, limit=PAGE_SIZE, cursor=None, start_date=None, end_date=None):
+    """One page of a user's entries, newest first.
+
+    `cursor` is the (entry_date, id) returned with the previous page. Each
+    page is an index range read on (user_id, entry_date), however deep it is.
+    """
+    query = "SELECT * FROM daily_entries WHERE user_id = %s"
+    params = (user_id,)
+    if start_date:
+        query += " AND entry_date >= %s"
+        params += (start_date,)
+    if end_date:
+        query += " AND entry_date <= %s"
+        params += (end_date,)
+    if cursor:
+        query += " AND (entry_date < %s OR (entry_date = %s AND id < %s))"
+        params += (cursor[0], cursor[0], cursor[1])
+    query += " ORDER BY entry_date DESC, id DESC LIMIT %s"
+    return _fetch_page(query, params, limit, ('entry_date', 'id'))
+
+def iter_entries(user_id, start_date=None, end_date=None, batch_size=500):
+    """Yield a user's entries newest first, holding one batch in memory at a time."""
     cursor = None
-    summaries = []
-    try:
-        cursor = conn.cursor(dictionary=True)
+    while True:
+        rows, cursor = get_entries_page(user_id, batch_size, cursor, start_date, end_date)
+        yield from rows
+        if cursor is None:
+            return
+
+@db_function()
+def get_user_data_version(user_id):
+    """(latest entry id, latest chunk id, latest indexed job id) for a user.
+
+    Changes whenever they write, and again once the index worker has added
+    the new chunks to their FAISS index.
+    """
+    with db_cursor() as cursor:
+        cursor.execute("SELECT (SELECT MAX(id) FROM daily_entries WHERE user_id = %s), (SELECT MAX(id) FROM entry_chunks WHERE user_id = %s), "
+                       "(SELECT MAX(id) FROM index_jobs WHERE user_id = %s AND status = 'done')", (user_id, user_id, user_id))
+        return tuple(cursor.fetchone())
+
+@db_function(default=list)
+def get_entry_dates(user_id):
+    with db_cursor() as cursor:
+        cursor.execute("SELECT DISTINCT entry_date FROM daily_entries WHERE user_id = %s ORDER BY entry_date", (user_id,))
+        return [row[0] for row in cursor.fetchall()]
+
+SUMMARY_TABLES = {'weekly': 'weekly_summaries', 'monthly': 'monthly_summaries'}
+
+@db_function(default=set)
+def get_summarized_periods(kind, start_date, end_date):
+    """(user_id, start_date, end_date) of every summary of `kind` starting in the range, for all users."""
+    table = SUMMARY_TABLES[kind]
+    with db_cursor() as cursor:
+        cursor.execute(f"SELECT user_id, start_date, end_date FROM {table} WHERE start_date BETWEEN %s AND %s", (start_date, end_date))
+        return set(cursor.fetchall())
+
+@db_function(default=list)
+def get_weekly_summaries(user_id):
+    with db_cursor(dictionary=True) as cursor:
         cursor.execute("SELECT * FROM weekly_summaries WHERE user_id = %s ORDER BY start_date DESC", (user_id,))
-        summaries = cursor.fetchall()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return summaries
+        return cursor.fetchall()
 
+@db_function(default=list)
 def get_monthly_summaries(user_id):
-    conn = get_db_connection()
-    if not conn: return []
-    cursor = None
-    summaries = []
-    try:
-        cursor = conn.cursor(dictionary=True)
+    with db_cursor(dictionary=True) as cursor:
         cursor.execute("SELECT * FROM monthly_summaries WHERE user_id = %s ORDER BY start_date DESC", (user_id,))
-        summaries = cursor.fetchall()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return summaries
+        return cursor.fetchall()
+
+@db_function(default=lambda: ([], None))
+def get_summaries_page(kind, user_id, limit=PAGE_SIZE, cursor=None):
+    """One page of a user's weekly or monthly summaries, newest first.
+
+    A user has one summary per period, so the cursor is the (start_date,
+    end_date) of the last summary on the previous page.
+    """
+    table = SUMMARY_TABLES[kind]
+    query = f"SELECT * FROM {table} WHERE user_id = %s"
+    params = (user_id,)
+    if cursor:
+        query += " AND (start_date < %s OR (start_date = %s AND end_date < %s))"
+        params += (cursor[0], cursor[0], cursor[1])
+    query += " ORDER BY start_date DESC, end_date DESC LIMIT %s"
+    return _fetch_page(query, params, limit, ('start_date', 'end_date'))
 
+@db_function(default=list)
 def get_weekly_summaries_in_range(user_id, start_date, end_date):
-    conn = get_db_connection()
-    if not conn: return []
-    cursor = None
-    summaries = []
-    try:
-        cursor = conn.cursor(dictionary=True)
+    with db_cursor(dictionary=True) as cursor:
         query = "SELECT * FROM weekly_summaries WHERE user_id = %s AND start_date <= %s AND end_date >= %s ORDER BY start_date"
         cursor.execute(query, (user_id, end_date, start_date))
-        summaries = cursor.fetchall()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return summaries
+        return cursor.fetchall()
 
+@db_function(default=list)
 def get_monthly_summaries_in_range(user_id, start_date, end_date):
-    conn = get_db_connection()
-    if not conn: return []
-    cursor = None
-    summaries = []
-    try:
-        cursor = conn.cursor(dictionary=True)
+    with db_cursor(dictionary=True) as cursor:
         query = "SELECT * FROM monthly_summaries WHERE user_id = %s AND start_date <= %s AND end_date >= %s ORDER BY start_date"
         cursor.execute(query, (user_id, end_date, start_date))
-        summaries = cursor.fetchall()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return summaries
+        return cursor.fetchall()
 
+@db_function(default=False)
 def save_weekly_summary(user_id, start_date, end_date, summary):
-    conn = get_db_connection()
-    if not conn: return False
-    cursor = None
     try:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO weekly_summaries (user_id, start_date, end_date, summary) VALUES (%s, %s, %s, %s)", (user_id, start_date, end_date, summary))
-        conn.commit()
+        with db_cursor(commit=True) as cursor:
+            cursor.execute("INSERT INTO weekly_summaries (user_id, start_date, end_date, summary) VALUES (%s, %s, %s, %s)", (user_id, start_date, end_date, summary))
         return True
     except mysql.connector.Error as err:
         return False
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
 
+@db_function(default=False)
 def save_monthly_summary(user_id, start_date, end_date, summary):
-    conn = get_db_connection()
-    if not conn: return False
-    cursor = None
     try:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO monthly_summaries (user_id, start_date, end_date, summary) VALUES (%s, %s, %s, %s)", (user_id, start_date, end_date, summary))
-        conn.commit()
+        with db_cursor(commit=True) as cursor:
+            cursor.execute("INSERT INTO monthly_summaries (user_id, start_date, end_date, summary) VALUES (%s, %s, %s, %s)", (user_id, start_date, end_date, summary))
         return True
     except mysql.connector.Error as err:
         return False
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
 
+@db_function(default=False)
 def save_chat_history(user_id, query, response):
-    conn = get_db_connection()
-    if not conn: return False
-    cursor = None
     try:
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO chat_history (user_id, query, response) VALUES (%s, %s, %s)", (user_id, query, response))
-        conn.commit()
+        with db_cursor(commit=True) as cursor:
+            cursor.execute("INSERT INTO chat_history (user_id, query, response) VALUES (%s, %s, %s)", (user_id, query, response))
         return True
     except mysql.connector.Error as err:
         return False
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
 
-def get_chat_history(user_id):
-    conn = get_db_connection()
-    if not conn: return []
-    cursor = None
-    history = []
+@db_function(default=False)
+def save_intent_decisions(rows):
+    """Insert (user_id, query, local_intent, local_confidence, local_method, llm_intent) rows."""
     try:
-        cursor = conn.cursor(dictionary=True)
+        with db_cursor(commit=True) as cursor:
+            cursor.executemany("INSERT INTO intent_decisions (user_id, query, local_intent, local_confidence, local_method, llm_intent) VALUES (%s, %s, %s, %s, %s, %s)",
+                               rows)
+        return True
+    except mysql.connector.Error as err:
+        return False
+
+@db_function(default=list)
+def get_chat_history(user_id):
+    with db_cursor(dictionary=True) as cursor:
         cursor.execute("SELECT * FROM chat_history WHERE user_id = %s ORDER BY timestamp DESC", (user_id,))
-        history = cursor.fetchall()
-    finally:
-        if conn and conn.is_connected():
-            if cursor: cursor.close()
-            conn.close()
-    return history
\ No newline at end of file
+        return cursor.fetchall()
+
+# InnoDB ignores words shorter than innodb_ft_min_token_size (3 by default)
+FULLTEXT_MIN_TOKEN = 3
+FULLTEXT_WORD = re.compile(r"\w+")
+
+def fulltext_query(term):
+    """Boolean-mode query requiring every word of `term` as a prefix, or None if no word is indexable."""
+    words = [word for word in FULLTEXT_WORD.findall(term) if len(word) >= FULLTEXT_MIN_TOKEN]
+    return " ".join(f"+{word}*" for word in words) or None
+
+@db_function(default=lambda: ([], None))
+def search_chat_history(user_id, start=None, end=None, term=None, limit=PAGE_SIZE, cursor=None):
+    """One page of a user's chat history matching a date range and keyword, newest first.
+
+    `start`/`end` are datetimes bounding the timestamp. `term` is matched
+    against the question and answer through the FULLTEXT index; a term with
+    only very short words falls back to a substring match within the range.
+    `cursor` is the (timestamp, id) returned with the previous page.
+    """
+    query = "SELECT * FROM chat_history WHERE user_id = %s"
+    params = (user_id,)
+    if start:
+        query += " AND timestamp >= %s"
+        params += (start,)
+    if end:
+        query += " AND timestamp <= %s"
+        params += (end,)
+    if term and term.strip():
+        match = fulltext_query(term)
+        if match:
+            query += " AND MATCH(query, response) AGAINST (%s IN BOOLEAN MODE)"
+            params += (match,)
+        else:
+            pattern = "%" + re.sub(r"([\\%_])", r"\\\1", term.strip()) + "%"
+            query += " AND (query LIKE %s OR response LIKE %s)"
+            params += (pattern, pattern)
+    if cursor:
+        query += " AND (timestamp < %s OR (timestamp = %s AND id < %s))"
+        params += (cursor[0], cursor[0], cursor[1])
+    query += " ORDER BY timestamp DESC, id DESC LIMIT %s"
+    return _fetch_page(query, params, limit, ('timestamp', 'id'))
+
+def get_chat_history_page(user_id, limit=PAGE_SIZE, cursor=None, start_time=None, end_time=None):
+    """One page of a user's chat history, newest first.
+
+    `cursor` is the (timestamp, id) returned with the previous page.
+    """
+    return search_chat_history(user_id, start_time, end_time, None, limit, cursor)
+
+def iter_chat_history(user_id, start_time=None, end_time=None, cursor=None, batch_size=500):
+    """Yield a user's chat history newest first, one batch in memory at a time.
+
+    Starts after `cursor` when given. No connection is held between batches,
+    so the consumer may stop early.
+    """
+    while True:
+        rows, cursor = get_chat_history_page(user_id, batch_size, cursor, start_time, end_time)
+        yield from rows
+        if cursor is None:
+            return
+
+# --- Index Jobs ---
+# How many times a job is tried before it is left as 'failed', and how long a
+# claimed job may stay 'running' before another worker takes it over (the
+# first worker is assumed to have died).
+INDEX_JOB_MAX_ATTEMPTS = int(os.getenv("INDEX_JOB_MAX_ATTEMPTS", "5"))
+INDEX_JOB_STALE_SECONDS = int(os.getenv("INDEX_JOB_STALE_SECONDS", "600"))
+# Seconds to wait for another process to finish writing a user's FAISS index
+INDEX_LOCK_TIMEOUT = int(os.getenv("INDEX_LOCK_TIMEOUT", "300"))
+
+@contextmanager
+def user_index_lock(user_id, timeout=INDEX_LOCK_TIMEOUT):
+    """Hold the MySQL named lock for one user's FAISS index while the block runs.
+
+    Every process that reads, changes and saves an index file (the index
+    worker and the build, rebuild and migrate scripts) takes this lock first,
+    so one can never save over another's changes. The lock belongs to a
+    pooled connection kept checked out until the block exits. Yields whether
+    the lock was acquired within `timeout` seconds. Named locks are not
+    re-entrant across connections, so never nest two for the same user.
+    """
+    name = f"{os.getenv('MYSQL_DATABASE')}.faiss_user_{user_id}"
+    with ExitStack() as stack:
+        try:
+            cursor = stack.enter_context(db_cursor())
+        except NoConnection:
+            yield False
+            return
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+        acquired = cursor.fetchone()[0] == 1
+        if acquired:
+            # Runs before the cursor and connection are returned
+            stack.callback(_release_lock, cursor, name)
+        yield acquired
+
+def _release_lock(cursor, name):
+    cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+    cursor.fetchone()
+
+@db_function(default=list)
+def claim_index_jobs(limit=100, stale_seconds=INDEX_JOB_STALE_SECONDS):
+    """Mark up to `limit` pending jobs as running and return them, oldest first.
+
+    Rows are locked with SKIP LOCKED, so several workers can claim at once
+    without taking the same job. Jobs for one user may still reach two
+    workers (or a stale job a worker that is only slow); user_index_lock
+    serializes their index updates. Returns dicts with id, user_id and entry_id.
+    """
+    try:
+        with db_cursor(dictionary=True, commit=True) as cursor:
+            cursor.execute("SELECT id, user_id, entry_id FROM index_jobs WHERE status IN ('pending', 'running') "
+                           "AND (status = 'pending' OR claimed_at < NOW() - INTERVAL %s SECOND) "
+                           "ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED", (stale_seconds, limit))
+            jobs = cursor.fetchall()
+            if jobs:
+                placeholders = ','.join(['%s'] * len(jobs))
+                cursor.execute(f"UPDATE index_jobs SET status = 'running', claimed_at = NOW(), attempts = attempts + 1 WHERE id IN ({placeholders})",
+                               [job['id'] for job in jobs])
+        return jobs
+    except mysql.connector.Error as err:
+        print(f"Error claiming index jobs: {err}")
+        return []
+
+@db_function(default=False)
+def complete_index_jobs(job_ids):
+    if not job_ids: return True
+    try:
+        with db_cursor(commit=True) as cursor:
+            placeholders = ','.join(['%s'] * len(job_ids))
+            cursor.execute(f"UPDATE index_jobs SET status = 'done', completed_at = NOW(), last_error = NULL WHERE id IN ({placeholders})", tuple(job_ids))
+        return True
+    except mysql.connector.Error as err:
+        print(f"Error completing index jobs: {err}")
+        return False
+
+@db_function(default=False)
+def fail_index_jobs(job_ids, error, max_attempts=INDEX_JOB_MAX_ATTEMPTS):
+    """Put jobs back in the queue, or mark them failed once they have used `max_attempts`."""
+    if not job_ids: return True
+    try:
+        with db_cursor(commit=True) as cursor:
+            placeholders = ','.join(['%s'] * len(job_ids))
+            cursor.execute(f"UPDATE index_jobs SET status = IF(attempts >= %s, 'failed', 'pending'), last_error = %s WHERE id IN ({placeholders})",
+                           (max_attempts, str(error)[:1000], *job_ids))
+        return True
+    except mysql.connector.Error as err:
+        print(f"Error failing index jobs: {err}")
+        return False
+
+@db_function()
+def get_chunks_for_entries(user_id, entry_ids):
+    """Chunks of the given entries in id order, or None when the database is unavailable."""
+    if not entry_ids: return []
+    with db_cursor(dictionary=True) as cursor:
+        placeholders = ','.join(['%s'] * len(entry_ids))
+        query = f"SELECT id, entry_date, chunk_text FROM entry_chunks WHERE user_id = %s AND entry_id IN ({placeholders}) ORDER BY id"
+        cursor.execute(query, (user_id, *entry_ids))
+        return cursor.fetchall()
+
+@db_function()
+def get_latest_index_job(user_id):
+    """The index job of a user's most recently saved entry, with that entry's date, or None."""
+    with db_cursor(dictionary=True) as cursor:
+        cursor.execute("SELECT j.entry_id, j.status, j.attempts, j.last_error, j.created_at, j.completed_at, e.entry_date "
+                       "FROM index_jobs j JOIN daily_entries e ON e.id = j.entry_id "
+                       "WHERE j.user_id = %s ORDER BY j.id DESC LIMIT 1", (user_id,))
+        return cursor.fetchone()
@@ -0,0 +1,67 @@
+import hashlib
+import numpy as np
+from modules import database
+
+def text_hash(text):
+    """Content hash used to detect edited chunk text."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def _from_cache(row, expected_hash):
+    """Return the cached vector for a row, or None if it is missing or stale."""
+    if not row or row.get('embedding') is None or row.get('text_hash') != expected_hash:
+        return None
+    return np.frombuffer(bytes(row['embedding']), dtype=np.float32)
+
+def split_cached(chunks, cached):
+    """Look chunks up in the cache rows `cached` (chunk id -> row).
+
+    Returns (hashes, vectors, missing): vectors holds the cached vector or
+    None for each chunk, and missing the positions that need encoding.
+    """
+    hashes = [text_hash(chunk['chunk_text']) for chunk in chunks]
+    vectors = [_from_cache(cached.get(chunk['id']), h) for chunk, h in zip(chunks, hashes)]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    return hashes, vectors, missing
+
+def fill_missing(model_name, chunks, hashes, vectors, missing, encoded):
+    """Put freshly encoded vectors in place, write them to the cache and
+    return the float32 array aligned with `chunks`."""
+    encoded = np.asarray(encoded, dtype=np.float32)
+    rows = []
+    for i, vector in zip(missing, encoded):
+        vectors[i] = vector
+        rows.append((chunks[i]['id'], hashes[i], vector.tobytes()))
+    database.save_chunk_embeddings(model_name, rows)
+    return np.vstack(vectors).astype(np.float32, copy=False)
+
+def embed_chunks(model, model_name, chunks, cached=None, show_progress_bar=False):
+    """Embed chunks (dicts with 'id' and 'chunk_text'), reusing cached vectors.
+
+    `cached` maps chunk id to a row with 'text_hash' and 'embedding'; when it
+    is None the cache is queried for the given chunk ids. Only chunks with no
+    valid cached vector are encoded, and their vectors are written back.
+    Returns a float32 array aligned with `chunks`.
+    """
+    if not chunks:
+        return np.empty((0, 0), dtype=np.float32)
+    if cached is None:
+        cached = database.get_chunk_embeddings([chunk['id'] for chunk in chunks], model_name)
+
+    hashes, vectors, missing = split_cached(chunks, cached)
+    encoded = []
+    if missing:
+        encoded = model.encode([chunks[i]['chunk_text'] for i in missing], show_progress_bar=show_progress_bar)
+    return fill_missing(model_name, chunks, hashes, vectors, missing, encoded)
+
+def embed_user_chunks(model, model_name, user_id, show_progress_bar=False):
+    """Load all of a user's chunks with their cached vectors and embed the rest.
+
+    Returns (chunks, embeddings); chunks are ordered by id and carry their
+    entry_date.
+    """
+    rows = database.get_chunks_with_embeddings(user_id, model_name)
+    if not rows:
+        return [], np.empty((0, 0), dtype=np.float32)
+    chunks = [{'id': row['id'], 'entry_date': row['entry_date'], 'chunk_text': row['chunk_text']} for row in rows]
+    cached = {row['id']: row for row in rows}
+    return chunks, embed_chunks(model, model_name, chunks, cached=cached, show_progress_bar=show_progress_bar)
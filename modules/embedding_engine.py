@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from modules.embeddings import MODEL_NAME
+
+load_dotenv()
+
+# Worker processes for batch embedding and the number of texts encoded per
+# call. Each worker loads its own model copy, so the default stays small;
+# raise it on machines with memory to spare. Batches mix chunks from as many
+# users as needed.
+EMBED_WORKERS = max(1, int(os.getenv("EMBED_WORKERS", "2")))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+
+_worker_model = None
+
+def _init_worker(model_name, threads):
+    """Load this worker's model copy once, limited to its share of the cores."""
+    global _worker_model
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    from sentence_transformers import SentenceTransformer
+    _worker_model = SentenceTransformer(model_name)
+
+def _encode(texts):
+    return np.asarray(_worker_model.encode(texts, batch_size=len(texts)), dtype=np.float32)
+
+class EmbeddingEngine:
+    """Encodes chunks from many users in fixed-size batches on a process pool.
+
+    Workers are started with `spawn` so none of them inherits the parent's
+    MySQL connections or model state. At most `max_pending` batches are in
+    flight, which bounds memory however many users are queued.
+    """
+
+    def __init__(self, model_name=MODEL_NAME, workers=EMBED_WORKERS, batch_size=EMBED_BATCH_SIZE, max_pending=None):
+        self.model_name = model_name
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_pending = max_pending or workers * 2
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_init_worker, initargs=(model_name, threads))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown()
+
+    def embed(self, jobs):
+        """Encode texts for many keys, yielding (key, vectors) as each key completes.
+
+        `jobs` yields (key, texts) pairs, typically one per user; vectors are
+        float32 and aligned with that key's texts. Keys with no texts are
+        yielded straight away. Completion order follows the batches, not the
+        order of `jobs`.
+        """
+        parts, remaining = {}, {}
+        pending = deque()
+        texts_batch, segments = [], []
+
+        for key, texts in jobs:
+            if not texts:
+                yield key, np.empty((0, 0), dtype=np.float32)
+                continue
+            parts[key] = []
+            remaining[key] = len(texts)
+            start = 0
+            while start < len(texts):
+                take = min(self.batch_size - len(texts_batch), len(texts) - start)
+                texts_batch.extend(texts[start:start + take])
+                segments.append((key, start, take))
+                start += take
+                if len(texts_batch) == self.batch_size:
+                    pending.append((self._pool.submit(_encode, texts_batch), segments))
+                    texts_batch, segments = [], []
+                    while len(pending) >= self.max_pending:
+                        yield from self._collect(*pending.popleft(), parts, remaining)
+
+        if texts_batch:
+            pending.append((self._pool.submit(_encode, texts_batch), segments))
+        while pending:
+            yield from self._collect(*pending.popleft(), parts, remaining)
+
+    @staticmethod
+    def _collect(future, segments, parts, remaining):
+        """Route one batch's vectors back to their keys; yield keys that are complete."""
+        vectors = future.result()
+        offset = 0
+        for key, start, count in segments:
+            parts[key].append((start, vectors[offset:offset + count]))
+            offset += count
+            remaining[key] -= count
+            if remaining[key] == 0:
+                del remaining[key]
+                done = sorted(parts.pop(key), key=lambda part: part[0])
+                yield key, np.vstack([part for _, part in done])
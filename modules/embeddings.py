@@ -0,0 +1,76 @@
+import threading
+from functools import lru_cache
+import numpy as np
+
+# Global configuration
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+_models = {}
+_lock = threading.Lock()
+
+def get_model(model_name=MODEL_NAME):
+    """Return the process-wide SentenceTransformer for `model_name`.
+
+    The model is loaded on first use; concurrent callers wait for the same
+    load instead of each loading a copy. Returns None if loading fails.
+    """
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+    with _lock:
+        model = _models.get(model_name)
+        if model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+                model = SentenceTransformer(model_name)
+                _models[model_name] = model
+            except Exception as e:
+                print(f"Error loading SentenceTransformer model: {e}")
+                return None
+    return model
+
+def is_loaded(model_name=MODEL_NAME):
+    """Check whether a model has already been loaded in this process."""
+    return model_name in _models
+
+def get_embedding_dimension(model_name=MODEL_NAME):
+    """Get the embedding dimension of a model, loading it if needed."""
+    model = get_model(model_name)
+    return model.get_sentence_embedding_dimension() if model else None
+
+def warm_up(model_name=MODEL_NAME, background=False):
+    """Load a model and run one encode so the first real request is fast.
+
+    With background=True the work happens on a daemon thread and the call
+    returns immediately.
+    """
+    if background:
+        if is_loaded(model_name):
+            return True
+        threading.Thread(target=warm_up, args=(model_name,), daemon=True).start()
+        return True
+    model = get_model(model_name)
+    if model is None:
+        return False
+    model.encode(["warm up"])
+    return True
+
+@lru_cache(maxsize=256)
+def _encode_query_cached(text, model_name):
+    model = get_model(model_name)
+    if model is None:
+        return None
+    vector = np.asarray(model.encode([text], normalize_embeddings=True), dtype=np.float32)[0]
+    vector.setflags(write=False)
+    return vector
+
+def encode_query(text, model_name=MODEL_NAME):
+    """Unit-length float32 embedding of a query, memoized per process.
+
+    The answer cache, the intent classifier and vector search all embed the
+    same question; this encodes it once. Returns None if the model is unavailable.
+    """
+    vector = _encode_query_cached(text, model_name)
+    if vector is None:
+        _encode_query_cached.cache_clear()
+    return vector
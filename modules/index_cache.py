@@ -0,0 +1,118 @@
+import os
+import threading
+from collections import OrderedDict
+import faiss
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Memory budget for loaded FAISS indexes, shared by every session in the process
+INDEX_CACHE_MB = int(os.getenv("FAISS_INDEX_CACHE_MB", "256"))
+
+class IndexCache:
+    """Thread-safe LRU cache of FAISS indexes read from disk.
+
+    Entries are keyed by file path and validated against the file's mtime and
+    size on every lookup, so an index rewritten by another process or worker
+    is re-read on its next use. Eviction is least-recently-used once the
+    summed index sizes exceed the memory budget.
+    """
+
+    def __init__(self, max_bytes=INDEX_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def file_version(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def get(self, path, loader=faiss.read_index):
+        """Return the index stored at `path`, reading it only if it changed.
+
+        `loader` reads the file; sidecar files kept next to an index share
+        the cache and its memory budget by passing their own.
+        """
+        version = self.file_version(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and version is not None and entry['version'] == version:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry['index']
+            if entry is not None:
+                self._remove(path)
+                self.invalidations += 1
+            self.misses += 1
+        if version is None:
+            return None
+
+        index = loader(path)
+        self._insert(path, index, version)
+        return index
+
+    def put(self, path, index):
+        """Cache an index that was just written to `path`."""
+        version = self.file_version(path)
+        if version is None:
+            return
+        self._insert(path, index, version)
+
+    def invalidate(self, path):
+        with self._lock:
+            if path in self._entries:
+                self._remove(path)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters for sizing the budget against the number of active users."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _insert(self, path, index, version):
+        # The file size is a close estimate of the index's in-memory footprint
+        nbytes = version[1]
+        with self._lock:
+            if path in self._entries:
+                self._remove(path)
+            self._entries[path] = {'index': index, 'version': version, 'bytes': nbytes}
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, path):
+        entry = self._entries.pop(path)
+        self._bytes -= entry['bytes']
+
+# Global index cache instance
+index_cache = IndexCache()
+
+def get_index_cache():
+    """Get the global index cache instance."""
+    return index_cache
@@ -0,0 +1,187 @@
+import os
+import queue
+import random
+import re
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from modules import database, embeddings, llm_handler
+
+load_dotenv()
+
+# Below this confidence the LLM makes the decision. A small share of confident
+# local decisions is also sent to the LLM in the background so disagreement
+# can be measured.
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.6"))
+INTENT_AUDIT_RATE = float(os.getenv("INTENT_AUDIT_RATE", "0.05"))
+# Decisions are logged by one background writer, this many rows per INSERT
+INTENT_LOG_BATCH_SIZE = int(os.getenv("INTENT_LOG_BATCH_SIZE", "50"))
+
+SUMMARY_PATTERNS = [
+    r"\bsummar(y|ize|ise|ies)\b", r"\brecap\b", r"\boverview\b", r"\breview\b", r"\bhighlights?\b",
+    r"\bhow (was|were|has|have) (my|the|this|last)\b", r"\bwhat happened (this|last|during|over|in)\b",
+    r"\b(overall|in general|trends?|patterns?|themes?)\b",
+    # A date range alone is as common in a question ("did I see Tom last
+    # week?") as in a summary request, so it only cancels out a question word
+    # and leaves those queries to the LLM
+    r"\b(this|last|past|previous) (few |couple of )?(days|weeks?|months?|years?|weekend)\b",
+    r"\b(last|past) \d+ (days|weeks|months|years)\b",
+    r"\b(lately|recently|so far)\b",
+    r"\b(in|during|over|since) (january|february|march|april|may|june|july|august|september|october|november|december)\b",
+]
+QA_PATTERNS = [
+    r"^(what|when|where|who|which|why|did|do|have|was|were|is|how many|how much)\b",
+    r"\bwhat did i\b", r"\bwhen did i\b", r"\bdid i\b", r"\bwho (is|was|did)\b", r"\bwhere did i\b",
+    r"\bon my\b", r"\bbirthday\b", r"\bfirst time\b", r"\bname of\b",
+]
+KEYWORD_REGEX = ([(re.compile(pattern), 'summary') for pattern in SUMMARY_PATTERNS]
+                 + [(re.compile(pattern), 'qa') for pattern in QA_PATTERNS])
+
+LABELLED_EXAMPLES = {
+    'summary': [
+        "How was my week?", "Summarize my last month", "Give me an overview of this year",
+        "What happened over the past few weeks?", "Recap my January", "What were the main themes lately?",
+        "How have I been feeling recently overall?", "Review my progress this month",
+    ],
+    'qa': [
+        "What did I do on my birthday?", "When did I last go to the gym?", "Who did I have dinner with on Friday?",
+        "Where did I go on vacation?", "Did I finish the book I was reading?", "What was the name of that restaurant?",
+        "How many times did I mention running?", "Why was I upset with my sister?",
+    ],
+}
+
+_centroids = None
+_centroid_lock = threading.Lock()
+_stats_lock = threading.Lock()
+stats = {'keyword': 0, 'centroid': 0, 'llm': 0, 'audited': 0, 'disagreements': 0, 'unlogged': 0}
+_decisions = queue.Queue(maxsize=10000)
+_writer = None
+_writer_lock = threading.Lock()
+
+def _count(key, amount=1):
+    with _stats_lock:
+        stats[key] += amount
+
+def get_stats():
+    """Decision counts by method, plus LLM disagreements with the local classifier."""
+    with _stats_lock:
+        return dict(stats)
+
+def classify_by_keywords(query):
+    """Keyword and date-expression vote. Returns (intent, confidence)."""
+    text = query.lower().strip()
+    matches = [(match.start(), match.end(), intent) for regex, intent in KEYWORD_REGEX for match in regex.finditer(text)]
+    # Overlapping patterns ("what", "what did i", "did i") describe the same
+    # words, so only the longest match of a span votes
+    matches.sort(key=lambda m: m[0] - m[1])
+    scores = {'summary': 0, 'qa': 0}
+    taken = []
+    for start, end, intent in matches:
+        if any(start < other_end and other_start < end for other_start, other_end in taken):
+            continue
+        taken.append((start, end))
+        scores[intent] += 1
+    if scores['summary'] == scores['qa']:
+        return 'qa', 0.5
+    intent = 'summary' if scores['summary'] > scores['qa'] else 'qa'
+    margin = abs(scores['summary'] - scores['qa'])
+    return intent, min(0.95, 0.6 + 0.15 * margin)
+
+def _get_centroids(model):
+    global _centroids
+    if _centroids is None:
+        with _centroid_lock:
+            if _centroids is None:
+                centroids = {}
+                for label, examples in LABELLED_EXAMPLES.items():
+                    vectors = np.asarray(model.encode(examples, normalize_embeddings=True), dtype=np.float32)
+                    centroid = vectors.mean(axis=0)
+                    centroids[label] = centroid / np.linalg.norm(centroid)
+                _centroids = centroids
+    return _centroids
+
+def classify_by_centroid(query):
+    """Cosine similarity to labelled centroids. Returns (intent, confidence) or None."""
+    model = embeddings.get_model()
+    if model is None:
+        return None
+    centroids = _get_centroids(model)
+    vector = embeddings.encode_query(query)
+    scores = {label: float(vector @ centroid) for label, centroid in centroids.items()}
+    intent = max(scores, key=scores.get)
+    margin = scores[intent] - min(scores.values())
+    # A cosine margin of 0.2 between the two centroids counts as certain
+    return intent, min(0.95, 0.5 + margin * 2.25)
+
+def classify_with_llm(query):
+    prompt = f"Classify the user's query as 'qa' or 'summary'.\nQuery: '{query}'\nClassification:"
+    response = llm_handler.get_llm_response(prompt).strip().lower()
+    if "summary" in response:
+        return "summary"
+    return "qa"
+
+def classify_locally(query):
+    """Keywords first (sub-millisecond); the embedding centroids only when they are unsure."""
+    intent, confidence = classify_by_keywords(query)
+    method = 'keyword'
+    if confidence < INTENT_CONFIDENCE_THRESHOLD:
+        centroid = classify_by_centroid(query)
+        if centroid is not None and centroid[1] > confidence:
+            intent, confidence = centroid
+            method = 'centroid'
+    return intent, confidence, method
+
+def _write_decisions():
+    """Background writer: save queued decisions in batches."""
+    while True:
+        rows = [_decisions.get()]
+        while len(rows) < INTENT_LOG_BATCH_SIZE:
+            try:
+                rows.append(_decisions.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            saved = database.save_intent_decisions(rows)
+        except Exception as e:
+            # The writer must outlive a bad batch
+            print(f"Failed to log intent decisions: {e}")
+            saved = False
+        if not saved:
+            _count('unlogged', len(rows))
+
+def _record(user_id, query, local_intent, confidence, method, llm_intent):
+    """Queue a decision for the log; the request never waits on the INSERT."""
+    global _writer
+    if llm_intent is not None:
+        _count('audited')
+        if llm_intent != local_intent:
+            _count('disagreements')
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_decisions, daemon=True)
+            _writer.start()
+    try:
+        _decisions.put_nowait((user_id, query, local_intent, confidence, method, llm_intent))
+    except queue.Full:
+        # The database is falling behind; drop the row rather than block a query
+        _count('unlogged')
+
+def _audit(user_id, query, local_intent, confidence, method):
+    _record(user_id, query, local_intent, confidence, method, classify_with_llm(query))
+
+def classify(query, user_id=None):
+    """Return 'qa' or 'summary', asking the LLM only when the local classifier is unsure."""
+    local_intent, confidence, method = classify_locally(query)
+    if confidence < INTENT_CONFIDENCE_THRESHOLD:
+        _count('llm')
+        llm_intent = classify_with_llm(query)
+        _record(user_id, query, local_intent, confidence, method, llm_intent)
+        return llm_intent
+
+    _count(method)
+    if random.random() < INTENT_AUDIT_RATE:
+        threading.Thread(target=_audit, args=(user_id, query, local_intent, confidence, method), daemon=True).start()
+    else:
+        # Logged without an LLM answer, so the decision log covers every query
+        _record(user_id, query, local_intent, confidence, method, None)
+    return local_intent
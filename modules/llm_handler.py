@@ -1,24 +1,77 @@
 import os
+import re
 from groq import Groq
 from dotenv import load_dotenv
 
 load_dotenv()
 
+LLM_MODEL = "llama-3.1-8b-instant"
+
 try:
     client = Groq(api_key=os.getenv("GROQ_API_KEY"))
 except Exception as e:
     print(f"Failed to initialize Groq client: {e}")
     client = None
 
+# Words count one token per ~4 characters and punctuation one token each, which
+# tracks the Llama tokenizer far better than a flat character ratio.
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def _token_cost(word):
+    return max(1, (len(word) + 3) // 4)
+
+def estimate_tokens(text):
+    """Approximate LLM token count of a text."""
+    return sum(_token_cost(match.group()) for match in TOKEN_PATTERN.finditer(text))
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text to at most about `max_tokens` tokens, marking the cut."""
+    used = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        used += _token_cost(match.group())
+        if used > max_tokens:
+            return text[:match.start()].rstrip() + " [...]"
+    return text
+
+def complete(prompt, max_tokens=None):
+    """Sends a prompt to the LLM and returns the response, raising on failure."""
+    if not client:
+        raise RuntimeError("Groq client is not initialized. Please check your API key.")
+    options = {"max_tokens": max_tokens} if max_tokens else {}
+    chat_completion = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=LLM_MODEL,
+        **options,
+    )
+    return chat_completion.choices[0].message.content
+
+def stream_completion(prompt, max_tokens=None):
+    """Yields the LLM response in pieces as they arrive, raising on failure."""
+    if not client:
+        raise RuntimeError("Groq client is not initialized. Please check your API key.")
+    options = {"max_tokens": max_tokens} if max_tokens else {}
+    stream = client.chat.completions.create(
+        messages=[{"role": "user", "content": prompt}],
+        model=LLM_MODEL,
+        stream=True,
+        **options,
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def stream_llm_response(prompt):
+    """Yields the LLM response in pieces; errors are yielded as text."""
+    try:
+        yield from stream_completion(prompt)
+    except Exception as e:
+        yield f"An error occurred while communicating with the LLM: {e}"
+
 def get_llm_response(prompt):
     """Sends a prompt to the LLM and returns the response."""
     if not client:
         return "Error: Groq client is not initialized. Please check your API key."
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.1-8b-instant",
-        )
-        return chat_completion.choices[0].message.content
+        return complete(prompt)
     except Exception as e:
-        return f"An error occurred while communicating with the LLM: {e}"
\ No newline at end of file
+        return f"An error occurred while communicating with the LLM: {e}"
@@ -0,0 +1,112 @@
+import os
+import re
+import mysql.connector
+from modules import database
+
+MIGRATIONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'sql', 'migrations'))
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Errors meaning a statement's change is already in place: table exists,
+# duplicate column, duplicate key name, and dropping an index that is gone.
+# Databases created by an older schema.sql already contain some of the
+# migrated objects, so these are skipped instead of failing the migration.
+ALREADY_APPLIED_ERRNOS = {1050, 1060, 1061, 1091}
+
+def list_migrations():
+    """(version, name, path) of every migration file, ordered by version."""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return sorted(migrations)
+
+def split_statements(sql):
+    """Split a migration file into statements, dropping `--` comment lines."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in "\n".join(lines).split(';') if statement.strip()]
+
+def ensure_migrations_table(cursor):
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INT PRIMARY KEY,"
+        " name VARCHAR(255) NOT NULL,"
+        " applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    )
+
+def get_applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def apply_migration(conn, cursor, version, name, path):
+    """Run one migration's statements and record it.
+
+    MySQL commits DDL implicitly, so a migration that fails halfway is not
+    rolled back; it is left unrecorded and rerunning it skips the statements
+    that already took effect.
+    """
+    with open(path, 'r') as f:
+        statements = split_statements(f.read())
+    for statement in statements:
+        try:
+            cursor.execute(statement)
+        except mysql.connector.Error as err:
+            if err.errno not in ALREADY_APPLIED_ERRNOS:
+                raise
+            print(f"    already applied: {statement.splitlines()[0]}")
+    cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+    conn.commit()
+
+def migrate(target=None, dry_run=False):
+    """Apply pending migrations up to `target` (all by default).
+
+    Returns the versions applied, or that would be applied with dry_run.
+    """
+    conn = database.get_db_connection()
+    if not conn:
+        print("Could not connect to the database.")
+        return []
+    cursor = None
+    applied_now = []
+    try:
+        cursor = conn.cursor()
+        ensure_migrations_table(cursor)
+        applied = get_applied_versions(cursor)
+        for version, name, path in list_migrations():
+            if version in applied or (target is not None and version > target):
+                continue
+            if dry_run:
+                print(f"  - Would apply {version:03d}_{name}")
+            else:
+                print(f"  - Applying {version:03d}_{name}")
+                try:
+                    apply_migration(conn, cursor, version, name, path)
+                except mysql.connector.Error as err:
+                    print(f"Migration {version:03d}_{name} failed: {err}")
+                    break
+            applied_now.append(version)
+    finally:
+        if conn and conn.is_connected():
+            if cursor: cursor.close()
+            conn.close()
+    return applied_now
+
+def status():
+    """(version, name, applied) for every migration file."""
+    conn = database.get_db_connection()
+    if not conn: return []
+    cursor = None
+    rows = []
+    try:
+        cursor = conn.cursor()
+        ensure_migrations_table(cursor)
+        applied = get_applied_versions(cursor)
+        rows = [(version, name, version in applied) for version, name, _ in list_migrations()]
+    finally:
+        if conn and conn.is_connected():
+            if cursor: cursor.close()
+            conn.close()
+    return rows
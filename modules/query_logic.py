@@ -1,99 +1,139 @@
-from modules import llm_handler, database
-import faiss
-import numpy as np
-from sentence_transformers import SentenceTransformer
-import os
+from modules import llm_handler, database, vector_store, embeddings, intent, context_packer
+from modules.answer_cache import answer_cache
 from datetime import timedelta
 
-MODEL_NAME = 'all-MiniLM-L6-v2'
-
-try:
-    model = SentenceTransformer(MODEL_NAME)
-except Exception as e:
-    model = None
-
 def get_faiss_index_path(user_id):
-    return f"faiss_index_user_{user_id}.bin"
+    return vector_store.vector_store.get_index_path(user_id)
 
 def get_faiss_index(user_id):
-    index_path = get_faiss_index_path(user_id)
-    if os.path.exists(index_path):
-        try:
-            return faiss.read_index(index_path)
-        except Exception as e:
-            print(f"Error reading FAISS index for user {user_id}: {e}")
-    return None
-
-def classify_intent(query):
-    prompt = f"Classify the user's query as 'qa' or 'summary'.\nQuery: '{query}'\nClassification:"
-    response = llm_handler.get_llm_response(prompt).strip().lower()
-    if "summary" in response:
-        return "summary"
-    return "qa"
-
-def get_optimized_summary_context(user_id, start_date, end_date):
+    return vector_store.vector_store.load_index(user_id)
+
+def classify_intent(query, user_id=None):
+    return intent.classify(query, user_id)
+
+def add_interval(intervals, start, end):
+    """Insert a closed date interval into a sorted list of disjoint intervals, merging neighbours."""
+    merged = []
+    placed = False
+    for current_start, current_end in intervals:
+        if current_end + timedelta(days=1) < start:
+            merged.append((current_start, current_end))
+        elif end + timedelta(days=1) < current_start:
+            if not placed:
+                merged.append((start, end))
+                placed = True
+            merged.append((current_start, current_end))
+        else:
+            start, end = min(start, current_start), max(end, current_end)
+    if not placed:
+        merged.append((start, end))
+    return sorted(merged)
+
+def is_covered(intervals, start, end):
+    """Whether [start, end] lies inside one of the merged intervals."""
+    return any(current_start <= start and end <= current_end for current_start, current_end in intervals)
+
+def get_summary_context_pieces(user_id, start_date, end_date):
+    """Coarsest available pieces for the range: monthly, then weekly summaries, then raw days.
+    
+    Coverage is tracked as merged date intervals, so the cost depends on the
+    number of summaries rather than the number of days in the range.
+    """
+    rows = database.get_summary_context_rows(user_id, start_date, end_date)
     context_pieces = []
-    covered_dates = set()
-
-    monthly_summaries = database.get_monthly_summaries_in_range(user_id, start_date, end_date)
-    for summary in monthly_summaries:
-        context_pieces.append(f"--- Monthly Summary ({summary['start_date']} to {summary['end_date']}) ---\n{summary['summary']}")
-        d = summary['start_date']
-        while d <= summary['end_date']:
-            covered_dates.add(d)
-            d += timedelta(days=1)
-
-    weekly_summaries = database.get_weekly_summaries_in_range(user_id, start_date, end_date)
-    for summary in weekly_summaries:
-        date_range_to_add = [summary['start_date'] + timedelta(days=x) for x in range((summary['end_date'] - summary['start_date']).days + 1)]
-        if not all(d in covered_dates for d in date_range_to_add):
-            context_pieces.append(f"--- Weekly Summary ({summary['start_date']} to {summary['end_date']}) ---\n{summary['summary']}")
-            for day in date_range_to_add:
-                covered_dates.add(day)
-
-    uncovered_dates = [start_date + timedelta(days=x) for x in range((end_date - start_date).days + 1) if (start_date + timedelta(days=x)) not in covered_dates]
-    if uncovered_dates:
-        daily_chunks_data = database.get_chunks_for_dates(user_id, uncovered_dates)
-        if daily_chunks_data:
-            chunks_by_date = {}
-            for chunk in daily_chunks_data:
-                chunks_by_date.setdefault(chunk['entry_date'], []).append(chunk['chunk_text'])
-            for entry_date, chunks in sorted(chunks_by_date.items()):
-                context_pieces.append(f"--- Raw Entry for {entry_date.strftime('%Y-%m-%d')} ---\n" + "\n".join(chunks))
+    covered = []
+
+    for row in rows:
+        if row['tier'] == 'monthly':
+            context_pieces.append(context_packer.make_piece('monthly', row['start_date'], row['end_date'], row['text']))
+            covered = add_interval(covered, row['start_date'], row['end_date'])
+
+    for row in rows:
+        if row['tier'] == 'weekly' and not is_covered(covered, row['start_date'], row['end_date']):
+            context_pieces.append(context_packer.make_piece('weekly', row['start_date'], row['end_date'], row['text']))
+            covered = add_interval(covered, row['start_date'], row['end_date'])
+
+    # Chunks on summarized days were already excluded by the query
+    chunks_by_date = {}
+    for row in rows:
+        if row['tier'] == 'chunk':
+            chunks_by_date.setdefault(row['start_date'], []).append(row['text'])
+    for entry_date, chunks in sorted(chunks_by_date.items()):
+        context_pieces.append(context_packer.make_piece('raw', entry_date, entry_date, "\n".join(chunks)))
     
-    return "\n\n".join(context_pieces) if context_pieces else None
+    return context_pieces
 
-def handle_query(user_id, query, start_date=None, end_date=None):
-    if model is None: return "Error: Embedding model not available."
+def get_optimized_summary_context(user_id, start_date, end_date, token_budget=None):
+    """Summary context for a date range, packed into the LLM token budget."""
+    return context_packer.pack_context(get_summary_context_pieces(user_id, start_date, end_date), token_budget)
 
-    intent = classify_intent(query)
+def prepare_query(user_id, query, start_date=None, end_date=None):
+    """Run everything up to the LLM call.
+    
+    Returns (answer, None, None) when the query is answered without the LLM
+    (cache hit or an error message), else (None, prompt, data_version).
+    """
+    model = embeddings.get_model()
+    if model is None: return "Error: Embedding model not available.", None, None
+
+    # Read once, before answering, so an entry saved meanwhile invalidates the answer
+    data_version = database.get_user_data_version(user_id)
+    cached = answer_cache.lookup(user_id, query, start_date, end_date, version=data_version)
+    if cached is not None: return cached, None, None
+
+    query_intent = classify_intent(query, user_id)
 
-    if intent == "qa":
+    if query_intent == "qa":
         index = get_faiss_index(user_id)
-        if index is None: return "Your journal search index has not been built."
-        all_chunks = database.get_all_chunks(user_id)
-        if not all_chunks: return "You have no journal entries to search."
+        if index is None: return "Your journal search index has not been built.", None, None
+        if index.ntotal == 0: return "You have no journal entries to search.", None, None
         
-        index_to_chunk_id_map = [chunk['id'] for chunk in all_chunks]
-        query_vector = model.encode([query])
-        k = min(5, len(all_chunks))
-        distances, indices = index.search(np.array(query_vector, dtype=np.float32), k)
+        # Only entries inside the selected date range are searched
+        results = vector_store.search_user_entries(user_id, query, top_k=5, start_date=start_date, end_date=end_date)
+        relevant_texts = [result['chunk_text'] for result in results]
         
-        retrieved_chunk_ids = [index_to_chunk_id_map[i] for i in indices[0] if i != -1]
-        relevant_texts = database.get_chunks_by_ids(user_id, retrieved_chunk_ids)
-        
-        if not relevant_texts: return "I couldn't find any relevant information."
+        if not relevant_texts:
+            if start_date or end_date: return f"I couldn't find any relevant information between {start_date} and {end_date}.", None, None
+            return "I couldn't find any relevant information.", None, None
         
         context = "\n\n---\n\n".join(relevant_texts)
         prompt = f"Use the following journal entries to answer the question.\n\nEntries:\n{context}\n\nQuestion: {query}\n\nAnswer:"
-        return llm_handler.get_llm_response(prompt)
+        return None, prompt, data_version
 
-    elif intent == "summary":
-        if not start_date or not end_date: return "Please select a date range for the summary."
-        
-        context = get_optimized_summary_context(user_id, start_date, end_date)
-        if not context: return f"I couldn't find any entries or summaries between {start_date} and {end_date}."
-        if len(context) > 15000: return "The selected date range is too large to summarize."
+    if not start_date or not end_date: return "Please select a date range for the summary.", None, None
+    
+    context = get_optimized_summary_context(user_id, start_date, end_date)
+    if not context: return f"I couldn't find any entries or summaries between {start_date} and {end_date}.", None, None
+
+    prompt = f"Based on the following context, provide a detailed summary for the user's query.\n\nContext:\n{context}\n\nQuery: {query}\n\nSummary:"
+    return None, prompt, data_version
 
-        prompt = f"Based on the following context, provide a detailed summary for the user's query.\n\nContext:\n{context}\n\nQuery: {query}\n\nSummary:"
-        return llm_handler.get_llm_response(prompt)
\ No newline at end of file
+def handle_query(user_id, query, start_date=None, end_date=None):
+    answer, prompt, data_version = prepare_query(user_id, query, start_date, end_date)
+    if prompt is None: return answer
+    try:
+        response = llm_handler.complete(prompt)
+    except Exception as e:
+        # Failures are returned but never cached
+        return f"An error occurred while communicating with the LLM: {e}"
+    answer_cache.store(user_id, query, response, start_date, end_date, version=data_version)
+    return response
+
+def handle_query_stream(user_id, query, start_date=None, end_date=None):
+    """Like handle_query, but yields the answer in pieces as the LLM produces them.
+    
+    The complete answer is cached once the stream finishes without error.
+    """
+    answer, prompt, data_version = prepare_query(user_id, query, start_date, end_date)
+    if prompt is None:
+        yield answer
+        return
+    pieces = []
+    try:
+        for piece in llm_handler.stream_completion(prompt):
+            pieces.append(piece)
+            yield piece
+    except Exception as e:
+        yield f"An error occurred while communicating with the LLM: {e}"
+        return
+    answer_cache.store(user_id, query, "".join(pieces), start_date, end_date, version=data_version)
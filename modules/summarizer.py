@@ -0,0 +1,248 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
+from dateutil.relativedelta import relativedelta
+from dotenv import load_dotenv
+from modules import database, llm_handler, context_packer
+
+load_dotenv()
+
+# Concurrency and Groq rate limits for the scheduled summarizers
+SUMMARIZER_WORKERS = int(os.getenv("SUMMARIZER_WORKERS", "4"))
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "20000"))
+SUMMARY_MAX_OUTPUT_TOKENS = int(os.getenv("SUMMARY_MAX_OUTPUT_TOKENS", "1024"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "2"))
+
+# Monthly summaries are built from weekly summaries and per-week digests
+# ("hierarchical") or from every raw entry of the month ("flat").
+MONTHLY_SUMMARY_MODES = ('hierarchical', 'flat')
+MONTHLY_SUMMARY_MODE = os.getenv("MONTHLY_SUMMARY_MODE", "hierarchical")
+MONTHLY_INPUT_TOKENS = int(os.getenv("MONTHLY_INPUT_TOKENS", "6000"))
+DIGEST_INPUT_TOKENS = int(os.getenv("DIGEST_INPUT_TOKENS", "3000"))
+DIGEST_OUTPUT_TOKENS = int(os.getenv("DIGEST_OUTPUT_TOKENS", "400"))
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Block until `amount` tokens are available, then take them."""
+        # A request larger than the bucket could never be served; cap it
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+class RateLimiter:
+    """Groq request and token limits, shared by every summarizer worker."""
+
+    def __init__(self, requests_per_minute=GROQ_REQUESTS_PER_MINUTE, tokens_per_minute=GROQ_TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, prompt_tokens, output_tokens=None):
+        self.requests.acquire(1)
+        self.tokens.acquire(prompt_tokens + (output_tokens or SUMMARY_MAX_OUTPUT_TOKENS))
+
+def complete_with_retry(prompt, limiter, max_retries=None, backoff=None, max_tokens=None):
+    """Rate-limited LLM call retried with exponential backoff and jitter."""
+    max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+    backoff = LLM_BACKOFF_SECONDS if backoff is None else backoff
+    prompt_tokens = llm_handler.estimate_tokens(prompt)
+    for attempt in range(max_retries + 1):
+        limiter.acquire(prompt_tokens, max_tokens)
+        try:
+            return llm_handler.complete(prompt, max_tokens=max_tokens)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff * (2 ** attempt) * (1 + random.random())
+            print(f"    - LLM call failed ({e}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+# --- Periods ---
+def last_complete_week(today=None):
+    """Monday to Sunday of the most recent full week."""
+    today = today or date.today()
+    end_date = today - timedelta(days=today.weekday() + 1)
+    return end_date - timedelta(days=6), end_date
+
+def last_complete_month(today=None):
+    """First to last day of the previous calendar month."""
+    today = today or date.today()
+    end_date = today.replace(day=1) - relativedelta(days=1)
+    return end_date.replace(day=1), end_date
+
+def period_containing(kind, day):
+    if kind == 'weekly':
+        start_date = day - timedelta(days=day.weekday())
+        return start_date, start_date + timedelta(days=6)
+    start_date = day.replace(day=1)
+    return start_date, start_date + relativedelta(months=1) - relativedelta(days=1)
+
+def last_complete_period(kind, today=None):
+    return last_complete_week(today) if kind == 'weekly' else last_complete_month(today)
+
+# --- Prompts ---
+def format_entries(entries):
+    return "\n\n".join([f"Date: {entry['entry_date']}\n{entry['content']}" for entry in entries])
+
+def build_weekly_prompt(entries, start_date, end_date):
+    return f"Review the following journal entries from the past week and provide a concise summary. Highlight key events, moods, and recurring themes.\n\nEntries:\n{format_entries(entries)}\n\nWeekly Summary:"
+
+def build_monthly_prompt(entries, start_date, end_date):
+    return f"Perform a comprehensive review of the journal entries from {start_date.strftime('%B %Y')}. Generate a detailed summary covering significant events, recurring themes, and personal growth.\n\nEntries:\n{format_entries(entries)}\n\nComprehensive Monthly Summary:"
+
+def build_digest_prompt(entries, start_date, end_date):
+    """Digest prompt in which every entry gets its own share of DIGEST_INPUT_TOKENS,
+    so a long first day cannot crowd out the rest of the week."""
+    cap = context_packer.water_fill_cap([llm_handler.estimate_tokens(entry['content']) for entry in entries], DIGEST_INPUT_TOKENS)
+    entries_text = format_entries([dict(entry, content=llm_handler.truncate_to_tokens(entry['content'], cap)) for entry in entries])
+    return f"Condense the following journal entries from {start_date} to {end_date} into a short digest of the key events, moods, and themes.\n\nEntries:\n{entries_text}\n\nDigest:"
+
+def build_monthly_reduce_prompt(pieces, start_date, end_date):
+    """Monthly prompt from (label, text) pieces, each trimmed to an equal share of the budget."""
+    piece_budget = max(1, MONTHLY_INPUT_TOKENS // len(pieces))
+    context = "\n\n".join(f"--- {label} ---\n{llm_handler.truncate_to_tokens(text, piece_budget)}" for label, text in pieces)
+    return f"Perform a comprehensive review of the journal from {start_date.strftime('%B %Y')}, given the weekly summaries and digests below. Generate a detailed summary covering significant events, recurring themes, and personal growth.\n\n{context}\n\nComprehensive Monthly Summary:"
+
+def uncovered_entries(entries, intervals):
+    """Entries whose date falls outside every (start, end) interval."""
+    return [entry for entry in entries if not any(start <= entry['entry_date'] <= end for start, end in intervals)]
+
+def monthly_pieces(user_id, start_date, end_date, limiter):
+    """Map step: weekly summaries, plus a digest for each week that has none.
+
+    Weeks whose raw entries already fit their share of the monthly budget
+    are passed through as-is instead of costing an extra LLM call. A week
+    that crosses the month boundary belongs to neither month's summaries;
+    each month uses its own days of it, from the raw entries.
+    """
+    weekly = [summary for summary in database.get_weekly_summaries_in_range(user_id, start_date, end_date)
+              if summary['start_date'] >= start_date and summary['end_date'] <= end_date]
+    pieces = [(summary['start_date'], f"Weekly Summary ({summary['start_date']} to {summary['end_date']})", summary['summary']) for summary in weekly]
+
+    entries = database.get_entries_in_range(user_id, start_date, end_date)
+    remaining = uncovered_entries(entries, [(summary['start_date'], summary['end_date']) for summary in weekly])
+    weeks = {}
+    for entry in remaining:
+        weeks.setdefault(period_containing('weekly', entry['entry_date']), []).append(entry)
+
+    piece_budget = MONTHLY_INPUT_TOKENS // max(1, len(pieces) + len(weeks))
+    for (week_start, week_end), week_entries in sorted(weeks.items()):
+        week_start, week_end = max(week_start, start_date), min(week_end, end_date)
+        text = format_entries(week_entries)
+        if llm_handler.estimate_tokens(text) <= piece_budget:
+            pieces.append((week_start, f"Entries ({week_start} to {week_end})", text))
+        else:
+            digest = complete_with_retry(build_digest_prompt(week_entries, week_start, week_end), limiter, max_tokens=DIGEST_OUTPUT_TOKENS)
+            pieces.append((week_start, f"Digest ({week_start} to {week_end})", digest))
+
+    return [(label, text) for _, label, text in sorted(pieces, key=lambda piece: piece[0])]
+
+def summarize_month_hierarchical(user_id, start_date, end_date, limiter):
+    """Reduce step: combine the month's pieces into one bounded monthly prompt."""
+    pieces = monthly_pieces(user_id, start_date, end_date, limiter)
+    if not pieces:
+        return None
+    return complete_with_retry(build_monthly_reduce_prompt(pieces, start_date, end_date), limiter)
+
+SUMMARY_KINDS = {
+    'weekly': {'build_prompt': build_weekly_prompt, 'save': 'save_weekly_summary'},
+    'monthly': {'build_prompt': build_monthly_prompt, 'save': 'save_monthly_summary'},
+}
+
+# --- Engine ---
+def plan_jobs(kind, users, backfill=False, today=None):
+    """List (user_id, start_date, end_date) periods that still need a summary.
+
+    Without backfill only the last complete period is considered; with it,
+    every period up to then that contains at least one entry. Periods that
+    already have a row in the summaries table are skipped, which makes a
+    rerun after a failure resume where it stopped.
+    """
+    last_start, last_end = last_complete_period(kind, today)
+    candidates = []
+    for user in users:
+        user_id = user['id']
+        if not backfill:
+            candidates.append((user_id, last_start, last_end))
+            continue
+        periods = {period_containing(kind, day) for day in database.get_entry_dates(user_id)}
+        candidates.extend((user_id, start, end) for start, end in sorted(periods) if end <= last_end)
+
+    if not candidates:
+        return []
+    earliest = min(start for _, start, _ in candidates)
+    done = database.get_summarized_periods(kind, earliest, last_start)
+    return [job for job in candidates if job not in done]
+
+def summarize_period(kind, user_id, start_date, end_date, limiter, monthly_mode=None):
+    """Summarize one (user, period) and save it. Returns 'saved', 'empty' or 'failed'."""
+    if kind == 'monthly' and (monthly_mode or MONTHLY_SUMMARY_MODE) == 'hierarchical':
+        summary = summarize_month_hierarchical(user_id, start_date, end_date, limiter)
+        if summary is None:
+            return 'empty'
+    else:
+        entries = database.get_entries_in_range(user_id, start_date, end_date)
+        if not entries:
+            return 'empty'
+        prompt = SUMMARY_KINDS[kind]['build_prompt'](entries, start_date, end_date)
+        summary = complete_with_retry(prompt, limiter)
+    save = getattr(database, SUMMARY_KINDS[kind]['save'])
+    if not save(user_id, start_date, end_date, summary):
+        return 'failed'
+    return 'saved'
+
+def run(kind, backfill=False, workers=SUMMARIZER_WORKERS, user_ids=None, today=None, limiter=None, monthly_mode=None):
+    """Generate all pending `kind` summaries concurrently. Returns status counts."""
+    print(f"Starting {kind} summarization for all users...")
+    users = database.get_all_users()
+    if user_ids:
+        users = [user for user in users if user['id'] in user_ids]
+    if not users:
+        print("No users found.")
+        return {}
+
+    jobs = plan_jobs(kind, users, backfill=backfill, today=today)
+    print(f"Found {len(jobs)} pending {kind} summaries for {len(users)} users ({workers} workers).")
+    limiter = limiter or RateLimiter()
+    counts = {'saved': 0, 'empty': 0, 'failed': 0}
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(summarize_period, kind, *job, limiter, monthly_mode): job for job in jobs}
+        for future in as_completed(futures):
+            user_id, start_date, end_date = futures[future]
+            try:
+                status = future.result()
+            except Exception as e:
+                print(f"  - User {user_id} {start_date} to {end_date}: failed ({e})")
+                status = 'failed'
+            else:
+                print(f"  - User {user_id} {start_date} to {end_date}: {status}")
+            counts[status] += 1
+
+    print(f"Finished in {time.monotonic() - start:.1f}s: {counts['saved']} saved, {counts['empty']} without entries, {counts['failed']} failed.")
+    return counts
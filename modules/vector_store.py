@@ -1,76 +1,321 @@
 import faiss
 import numpy as np
 import os
-from sentence_transformers import SentenceTransformer
-from modules import database
+import tempfile
+from modules import database, embedding_cache, embeddings
+from modules.embeddings import MODEL_NAME
+from modules.index_cache import index_cache
+from dotenv import load_dotenv
+
+load_dotenv()
 
 # Global configuration
-MODEL_NAME = 'all-MiniLM-L6-v2'
-FAISS_INDEX_PATH = "faiss_index_{}.bin"
+FAISS_INDEX_PATH = "faiss_index_user_{}.bin"
+# Sidecar holding each indexed chunk's entry date, for date-filtered search
+FAISS_DATES_PATH = "faiss_index_user_{}.dates.npz"
+
+# Index type is chosen from the number of vectors: exact flat search for small
+# journals, HNSW for heavy journalers and IVF-PQ above the second threshold.
+INDEX_KINDS = ('flat', 'hnsw', 'ivfpq')
+HNSW_MIN_VECTORS = int(os.getenv("FAISS_HNSW_MIN_VECTORS", "5000"))
+IVFPQ_MIN_VECTORS = int(os.getenv("FAISS_IVFPQ_MIN_VECTORS", "100000"))
+HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+IVF_NLIST = int(os.getenv("FAISS_IVF_NLIST", "0"))  # 0 derives nlist from the corpus size
+IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "32"))
+PQ_M = int(os.getenv("FAISS_PQ_M", "96"))
+IVF_TRAIN_SAMPLE = int(os.getenv("FAISS_IVF_TRAIN_SAMPLE", "100000"))
+
+# Vector storage for flat and HNSW indexes: float32, float16 or int8 (scalar
+# quantized). With a re-rank factor above 1, compressed indexes fetch
+# factor * top_k candidates and re-score them with cached float32 vectors.
+VECTOR_STORAGES = ('float32', 'float16', 'int8')
+VECTOR_STORAGE = os.getenv("FAISS_VECTOR_STORAGE", "float32")
+RERANK_FACTOR = int(os.getenv("FAISS_RERANK_FACTOR", "4"))
+SQ_TYPES = {'float16': faiss.ScalarQuantizer.QT_fp16, 'int8': faiss.ScalarQuantizer.QT_8bit}
+
+# Date-filtered searches score up to this many in-range vectors exactly,
+# reconstructed from the index; larger ranges search the index through an ID
+# selector, widening HNSW efSearch / IVF nprobe as the range gets narrower.
+FILTER_EXACT_MAX = int(os.getenv("FAISS_FILTER_EXACT_MAX", "2000"))
+FILTER_EF_SEARCH_MAX = int(os.getenv("FAISS_FILTER_EF_SEARCH_MAX", "1024"))
+
+def choose_index_kind(num_vectors):
+    """Pick the index kind for a corpus of `num_vectors` chunks."""
+    if num_vectors >= IVFPQ_MIN_VECTORS:
+        return 'ivfpq'
+    if num_vectors >= HNSW_MIN_VECTORS:
+        return 'hnsw'
+    return 'flat'
+
+def get_index_kind(index):
+    """Report which of INDEX_KINDS an index was built as."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        return 'hnsw'
+    if isinstance(inner, faiss.IndexIVF):
+        return 'ivfpq'
+    return 'flat'
+
+def get_index_storage(index):
+    """Report how vectors are stored: one of VECTOR_STORAGES, or 'pq'."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexIVF):
+        return 'pq'
+    if isinstance(inner, faiss.IndexHNSW):
+        inner = faiss.downcast_index(inner.storage)
+    if isinstance(inner, faiss.IndexScalarQuantizer):
+        for storage, qtype in SQ_TYPES.items():
+            if inner.sq.qtype == qtype:
+                return storage
+    return 'float32'
+
+def rebuild_storage(index):
+    """Storage to rebuild `index` with: its own, or None (FAISS_VECTOR_STORAGE)
+    when there is no index or it is IVF-PQ, which has no storage mode."""
+    if index is None:
+        return None
+    storage = get_index_storage(index)
+    return storage if storage in VECTOR_STORAGES else None
+
+def ivf_nlist(num_vectors):
+    """Number of IVF lists, keeping at least 39 training points per centroid."""
+    if IVF_NLIST:
+        return IVF_NLIST
+    return max(1, min(int(4 * np.sqrt(num_vectors)), num_vectors // 39))
+
+def configure_search(index):
+    """Apply the configured search-time parameters to a loaded index."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = HNSW_EF_SEARCH
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = IVF_NPROBE
+    return index
+
+def day_numbers(dates):
+    """Entry dates as int32 proleptic ordinals, the sidecar's compact date form."""
+    return np.array([day.toordinal() for day in dates], dtype=np.int32)
+
+def read_dates(path):
+    """Load a dates sidecar: chunk ids, day numbers and the index file version it matches."""
+    with np.load(path) as data:
+        return {'ids': data['ids'], 'days': data['days'], 'index_version': tuple(int(v) for v in data['index_version'])}
+
+def in_date_range(days, start_date=None, end_date=None):
+    """Boolean mask of the day numbers between start_date and end_date, inclusive."""
+    in_range = np.ones(len(days), dtype=bool)
+    if start_date:
+        in_range &= days >= start_date.toordinal()
+    if end_date:
+        in_range &= days <= end_date.toordinal()
+    return in_range
+
+def temp_path_for(path):
+    """A new, uniquely named temp file next to `path`, for a write-then-rename.
+    
+    Each writer gets its own file, so concurrent saves cannot interleave.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    # mkstemp creates the file owner-only; keep the usual index file permissions
+    os.chmod(tmp_path, 0o644)
+    return tmp_path
+
+def remove_quietly(path):
+    """Delete a leftover temp file, if any."""
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def filter_search_params(index, num_selected):
+    """Search parameters restricting `index` to a subset of `num_selected` ids."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    widen = index.ntotal / max(num_selected, 1)
+    if isinstance(inner, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = min(FILTER_EF_SEARCH_MAX, max(HNSW_EF_SEARCH, int(HNSW_EF_SEARCH * widen)))
+    elif isinstance(inner, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = min(inner.nlist, max(IVF_NPROBE, int(IVF_NPROBE * widen)))
+    else:
+        params = faiss.SearchParameters()
+    return params
 
 class VectorStore:
     """Manages FAISS vector stores for individual users."""
     
     def __init__(self, model_name=MODEL_NAME):
-        """Initialize the vector store with a sentence transformer model."""
+        """Initialize the vector store; the model is loaded on first use."""
         self.model_name = model_name
-        try:
-            self.model = SentenceTransformer(model_name)
-            self.embedding_dim = self.model.get_sentence_embedding_dimension()
-        except Exception as e:
-            print(f"Error loading SentenceTransformer model: {e}")
-            self.model = None
-            self.embedding_dim = None
+    
+    @property
+    def model(self):
+        """The shared sentence transformer model, or None if it failed to load."""
+        return embeddings.get_model(self.model_name)
+    
+    @property
+    def embedding_dim(self):
+        return embeddings.get_embedding_dimension(self.model_name)
     
     def get_index_path(self, user_id):
         """Get the file path for a user's FAISS index."""
         return FAISS_INDEX_PATH.format(user_id)
     
-    def load_index(self, user_id):
-        """Load a user's FAISS index from disk."""
+    def load_index(self, user_id, use_cache=True):
+        """Load a user's FAISS index, from the in-memory cache when it is current.
+        
+        Cached indexes are shared between sessions, so callers that modify the
+        index must pass use_cache=False to get a private copy.
+        """
         index_path = self.get_index_path(user_id)
         if os.path.exists(index_path):
             try:
+                if use_cache:
+                    return index_cache.get(index_path)
                 return faiss.read_index(index_path)
             except Exception as e:
                 print(f"Error loading FAISS index for user {user_id}: {e}")
                 return None
         return None
     
+    def get_dates_path(self, user_id):
+        """Get the file path for a user's chunk dates sidecar."""
+        return FAISS_DATES_PATH.format(user_id)
+    
+    def save_dates(self, user_id, chunk_ids, days):
+        """Write the dates sidecar for the index file currently on disk.
+        
+        The sidecar records that file's version, so one left behind by an
+        index rewritten elsewhere is detected as stale and rebuilt.
+        """
+        index_version = index_cache.file_version(self.get_index_path(user_id))
+        if index_version is None:
+            return False
+        dates_path = self.get_dates_path(user_id)
+        dates = {'ids': np.asarray(chunk_ids, dtype=np.int64), 'days': np.asarray(days, dtype=np.int32), 'index_version': index_version}
+        tmp_path = None
+        try:
+            tmp_path = temp_path_for(dates_path)
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, ids=dates['ids'], days=dates['days'], index_version=np.array(index_version, dtype=np.int64))
+            os.replace(tmp_path, dates_path)
+            index_cache.put(dates_path, dates)
+            return True
+        except Exception as e:
+            print(f"Error saving chunk dates for user {user_id}: {e}")
+            remove_quietly(tmp_path)
+            return False
+    
+    def load_dates(self, user_id, index):
+        """Chunk ids and day numbers of the vectors in a user's index.
+        
+        A missing or stale sidecar is rebuilt in memory from entry_chunks and
+        not saved: only writers holding database.user_index_lock write
+        sidecars, so a reader cannot overwrite one made for a newer index.
+        """
+        dates_path = self.get_dates_path(user_id)
+        index_version = index_cache.file_version(self.get_index_path(user_id))
+        try:
+            dates = index_cache.get(dates_path, loader=read_dates)
+        except Exception as e:
+            print(f"Error loading chunk dates for user {user_id}: {e}")
+            dates = None
+        if dates is not None and dates['index_version'] == index_version:
+            return dates['ids'], dates['days']
+        return self.index_dates(user_id, index)
+    
+    def index_dates(self, user_id, index):
+        """Chunk ids and day numbers of the indexed chunks, read from entry_chunks."""
+        rows = database.get_chunk_dates(user_id)
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        days = day_numbers([row[1] for row in rows])
+        indexed = np.isin(ids, faiss.vector_to_array(index.id_map))
+        return ids[indexed], days[indexed]
+    
     def save_index(self, index, user_id):
         """Save a user's FAISS index to disk."""
         index_path = self.get_index_path(user_id)
+        tmp_path = None
         try:
-            faiss.write_index(index, index_path)
+            # Write to a private temp file first so readers never see a half-written index
+            tmp_path = temp_path_for(index_path)
+            faiss.write_index(index, tmp_path)
+            os.replace(tmp_path, index_path)
+            index_cache.put(index_path, index)
             return True
         except Exception as e:
             print(f"Error saving FAISS index for user {user_id}: {e}")
+            remove_quietly(tmp_path)
             return False
     
-    def create_index(self, user_id):
-        """Create a new FAISS index for a user from their chunks."""
+    def new_index(self, num_vectors=0, kind=None, dim=None, storage=None):
+        """Create an empty index whose labels are entry_chunks ids.
+        
+        The index kind defaults to the one chosen for `num_vectors` and the
+        storage to FAISS_VECTOR_STORAGE. IVF-PQ and int8 indexes must be
+        trained before vectors are added.
+        """
+        dim = dim or self.embedding_dim
+        kind = kind or choose_index_kind(num_vectors)
+        storage = storage or VECTOR_STORAGE
+        if storage not in VECTOR_STORAGES:
+            raise ValueError(f"Unknown vector storage '{storage}', expected one of {VECTOR_STORAGES}")
+        if kind == 'hnsw':
+            if storage == 'float32':
+                inner = faiss.IndexHNSWFlat(dim, HNSW_M)
+            else:
+                inner = faiss.IndexHNSWSQ(dim, SQ_TYPES[storage], HNSW_M)
+            inner.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        elif kind == 'ivfpq':
+            quantizer = faiss.IndexFlatL2(dim)
+            inner = faiss.IndexIVFPQ(quantizer, dim, ivf_nlist(num_vectors), PQ_M, 8)
+        elif storage == 'float32':
+            inner = faiss.IndexFlatL2(dim)
+        else:
+            inner = faiss.IndexScalarQuantizer(dim, SQ_TYPES[storage], faiss.METRIC_L2)
+        return configure_search(faiss.IndexIDMap2(inner))
+    
+    def build_index(self, vectors, chunk_ids, kind=None, storage=None):
+        """Build a trained, populated index for the given vectors and chunk ids."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        index = self.new_index(len(vectors), kind=kind, dim=vectors.shape[1], storage=storage)
+        if not index.is_trained:
+            sample = vectors
+            if len(vectors) > IVF_TRAIN_SAMPLE:
+                rng = np.random.default_rng(0)
+                sample = vectors[rng.choice(len(vectors), IVF_TRAIN_SAMPLE, replace=False)]
+            index.train(sample)
+        index.add_with_ids(vectors, np.asarray(chunk_ids, dtype=np.int64))
+        return index
+    
+    def create_index(self, user_id, storage=None):
+        """Create a new FAISS index for a user from their chunks.
+        
+        `storage` overrides FAISS_VECTOR_STORAGE for this index.
+        """
         if not self.model:
             print("Error: SentenceTransformer model not loaded")
             return False
         
-        chunks = database.get_all_chunks(user_id)
-        if not chunks:
-            print(f"No chunks found for user {user_id}")
-            return False
-        
-        chunk_texts = [chunk['chunk_text'] for chunk in chunks]
-        
         try:
-            # Generate embeddings
-            embeddings = self.model.encode(chunk_texts, show_progress_bar=True)
+            # Reuse cached embeddings and only encode new or edited chunks
+            chunks, embeddings = embedding_cache.embed_user_chunks(self.model, self.model_name, user_id, show_progress_bar=True)
+            if not chunks:
+                print(f"No chunks found for user {user_id}")
+                return False
+            chunk_ids = np.array([chunk['id'] for chunk in chunks], dtype=np.int64)
             
-            # Create FAISS index
-            index = faiss.IndexFlatL2(self.embedding_dim)
-            index.add(embeddings)
+            # Create FAISS index keyed by entry_chunks.id, sized to the corpus
+            index = self.build_index(embeddings, chunk_ids, storage=storage)
             
             # Save index
             if self.save_index(index, user_id):
-                print(f"Created FAISS index for user {user_id} with {index.ntotal} vectors")
+                self.save_dates(user_id, chunk_ids, day_numbers([chunk['entry_date'] for chunk in chunks]))
+                print(f"Created {get_index_kind(index)} FAISS index for user {user_id} with {index.ntotal} vectors")
                 return True
             return False
             
@@ -80,38 +325,122 @@ class VectorStore:
     
     def update_index(self, user_id):
         """Update a user's FAISS index with all their current chunks."""
-        return self.create_index(user_id)  # For simplicity, rebuild the entire index
+        # For simplicity, rebuild the entire index, keeping its storage
+        return self.create_index(user_id, storage=rebuild_storage(self.load_index(user_id)))
     
-    def search(self, user_id, query, top_k=5):
-        """Search a user's index for similar chunks."""
+    def search_ids(self, user_id, query, top_k=5, start_date=None, end_date=None):
+        """Search a user's index and return (chunk_id, distance) pairs, best first.
+        
+        With start_date and/or end_date only chunks from entries in that
+        range are considered.
+        """
         if not self.model:
             return []
         
         index = self.load_index(user_id)
-        if index is None:
+        if index is None or index.ntotal == 0:
             return []
         
-        chunks = database.get_all_chunks(user_id)
-        if not chunks:
+        configure_search(index)
+        query_embedding = embeddings.encode_query(query, self.model_name).reshape(1, -1)
+        if not isinstance(index, faiss.IndexIDMap):
+            return self.search_legacy(user_id, index, query_embedding, top_k, start_date, end_date)
+        rerank = RERANK_FACTOR > 1 and get_index_storage(index) != 'float32'
+        k = min(top_k * RERANK_FACTOR if rerank else top_k, index.ntotal)
+        if start_date or end_date:
+            ids, days = self.load_dates(user_id, index)
+            selected = ids[in_date_range(days, start_date, end_date)]
+            if len(selected) == 0:
+                return []
+            distances, labels = self.search_subset(index, query_embedding, selected, k)
+        else:
+            distances, labels = index.search(query_embedding, k)
+        hits = [(int(label), float(distance)) for label, distance in zip(labels[0], distances[0]) if label != -1]
+        if rerank:
+            hits = self.rerank(hits, query_embedding[0], top_k)
+        return hits
+    
+    def search_legacy(self, user_id, index, query_embedding, top_k, start_date=None, end_date=None):
+        """Search a legacy positional index, whose row i holds the user's i-th chunk.
+        
+        Costs a read of every chunk id and date, as searches did before
+        indexes carried chunk ids. The query path never rewrites the index:
+        the index worker or scripts/migrate_indexes.py converts it under
+        database.user_index_lock.
+        """
+        rows = database.get_chunk_dates(user_id)
+        # Chunks saved after the index was built have no row in it
+        rows = rows[:index.ntotal]
+        if not rows:
             return []
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        if start_date or end_date:
+            positions = np.flatnonzero(in_date_range(day_numbers([row[1] for row in rows]), start_date, end_date)).astype(np.int64)
+            if len(positions) == 0:
+                return []
+            distances, labels = self.search_subset(index, query_embedding, positions, top_k)
+        else:
+            distances, labels = index.search(query_embedding, min(top_k, len(ids)))
+        return [(int(ids[label]), float(distance)) for label, distance in zip(labels[0], distances[0]) if 0 <= label < len(ids)]
+    
+    def search_subset(self, index, query_embedding, chunk_ids, k):
+        """Nearest neighbours among `chunk_ids` only, in index.search's format.
+        
+        Small subsets are scored exactly from vectors reconstructed out of
+        the index (IVF-PQ cannot reconstruct by id); larger ones are searched
+        through an IDSelectorBatch.
+        """
+        k = min(k, len(chunk_ids))
+        if len(chunk_ids) <= FILTER_EXACT_MAX and get_index_kind(index) != 'ivfpq':
+            vectors = index.reconstruct_batch(chunk_ids)
+            distances = np.sum((vectors - query_embedding) ** 2, axis=1)
+            order = np.argsort(distances)[:k]
+            return distances[order][None, :], chunk_ids[order][None, :]
+        params = filter_search_params(index, len(chunk_ids))
+        params.sel = faiss.IDSelectorBatch(chunk_ids)
+        return index.search(query_embedding, k, params=params)
+    
+    def rerank(self, hits, query_vector, top_k):
+        """Re-score compressed-index candidates with exact float32 distances.
+        
+        Vectors come from the embedding cache; candidates without a cached
+        vector keep their approximate distance.
+        """
+        cached = database.get_chunk_embeddings([chunk_id for chunk_id, _ in hits], self.model_name)
+        rescored = []
+        for chunk_id, distance in hits:
+            row = cached.get(chunk_id)
+            if row is not None and row.get('embedding') is not None:
+                vector = np.frombuffer(bytes(row['embedding']), dtype=np.float32)
+                distance = float(np.sum((vector - query_vector) ** 2))
+            rescored.append((chunk_id, distance))
+        rescored.sort(key=lambda hit: hit[1])
+        return rescored[:top_k]
+    
+    def search(self, user_id, query, top_k=5, start_date=None, end_date=None):
+        """Search a user's index for similar chunks, optionally within a date range.
         
+        Costs one vector search plus one fetch of the top-k chunk rows.
+        """
         try:
-            # Encode query
-            query_embedding = self.model.encode([query])
+            hits = self.search_ids(user_id, query, top_k, start_date, end_date)
+            if not hits:
+                return []
             
-            # Search index
-            k = min(top_k, len(chunks))
-            distances, indices = index.search(query_embedding, k)
+            rows = database.get_chunk_rows_by_ids(user_id, [chunk_id for chunk_id, _ in hits])
+            chunks_by_id = {row['id']: row for row in rows}
             
             # Format results
             results = []
-            for i, distance in zip(indices[0], distances[0]):
-                if i != -1:
+            for chunk_id, distance in hits:
+                chunk = chunks_by_id.get(chunk_id)
+                if chunk is not None:
                     results.append({
-                        'chunk_text': chunks[i]['chunk_text'],
-                        'chunk_id': chunks[i]['id'],
-                        'distance': float(distance),
-                        'similarity': float(1 / (1 + distance))
+                        'chunk_text': chunk['chunk_text'],
+                        'chunk_id': chunk_id,
+                        'entry_date': chunk['entry_date'],
+                        'distance': distance,
+                        'similarity': 1 / (1 + distance)
                     })
             
             return results
@@ -121,21 +450,75 @@ class VectorStore:
             return []
     
     def add_chunks(self, user_id, new_chunks):
-        """Add new chunks to a user's index."""
+        """Append new chunks (dicts with 'id' and 'chunk_text') to a user's index.
+        
+        Only the new chunks are embedded. A missing index, or a legacy index
+        without chunk id labels, is rebuilt from scratch once. Call it under
+        database.user_index_lock.
+        """
         if not self.model:
             return False
         
-        # Get all existing chunks
-        all_chunks = database.get_all_chunks(user_id)
-        if not all_chunks:
-            return self.create_index(user_id)
+        index = self.load_index(user_id, use_cache=False)
+        # Rebuilds keep the index's storage, e.g. one migrate_indexes.py converted to int8
+        storage = rebuild_storage(index)
+        if index is None or not isinstance(index, faiss.IndexIDMap):
+            return self.create_index(user_id, storage=storage)
         
-        # Rebuild index with all chunks
-        return self.update_index(user_id)
+        existing_ids = set(faiss.vector_to_array(index.id_map).tolist())
+        new_chunks = [chunk for chunk in new_chunks if chunk['id'] not in existing_ids]
+        if not new_chunks:
+            return True
+        
+        # Promote to a faster index kind once the user crosses a threshold;
+        # the rebuild reads cached embeddings, so only new chunks are encoded.
+        target_kind = choose_index_kind(index.ntotal + len(new_chunks))
+        if INDEX_KINDS.index(target_kind) > INDEX_KINDS.index(get_index_kind(index)):
+            print(f"Promoting FAISS index for user {user_id} to {target_kind}")
+            return self.create_index(user_id, storage=storage)
+        
+        try:
+            # Dates of the vectors already indexed, read before the index file changes
+            ids, days = self.load_dates(user_id, index)
+            embeddings = embedding_cache.embed_chunks(self.model, self.model_name, new_chunks)
+            chunk_ids = np.array([chunk['id'] for chunk in new_chunks], dtype=np.int64)
+            index.add_with_ids(embeddings, chunk_ids)
+            if not self.save_index(index, user_id):
+                return False
+            if all('entry_date' in chunk for chunk in new_chunks):
+                new_days = day_numbers([chunk['entry_date'] for chunk in new_chunks])
+                self.save_dates(user_id, np.concatenate([ids, chunk_ids]), np.concatenate([days, new_days]))
+            else:
+                # Chunks without an entry_date: read every indexed chunk's date instead
+                self.save_dates(user_id, *self.index_dates(user_id, index))
+            return True
+        except Exception as e:
+            print(f"Error adding chunks to FAISS index for user {user_id}: {e}")
+            return False
+    
+    def add_missing_chunks(self, user_id):
+        """Append chunks saved after the index was built from an earlier read.
+        
+        The build script encodes a snapshot of the user's chunks; anything
+        written since is added here. Call it under database.user_index_lock.
+        """
+        index = self.load_index(user_id, use_cache=False)
+        if index is None or not isinstance(index, faiss.IndexIDMap):
+            return False
+        indexed = set(faiss.vector_to_array(index.id_map).tolist())
+        missing = [chunk_id for chunk_id, _ in database.get_chunk_dates(user_id) if chunk_id not in indexed]
+        if not missing:
+            return True
+        return self.add_chunks(user_id, database.get_chunk_rows_by_ids(user_id, missing))
     
     def delete_user_index(self, user_id):
-        """Delete a user's FAISS index file."""
+        """Delete a user's FAISS index file and its dates sidecar."""
         index_path = self.get_index_path(user_id)
+        index_cache.invalidate(index_path)
+        dates_path = self.get_dates_path(user_id)
+        index_cache.invalidate(dates_path)
+        if os.path.exists(dates_path):
+            os.remove(dates_path)
         if os.path.exists(index_path):
             try:
                 os.remove(index_path)
@@ -155,7 +538,10 @@ class VectorStore:
         return {
             'num_vectors': index.ntotal,
             'dimension': index.d,
-            'index_type': type(index).__name__
+            'index_type': type(index).__name__,
+            'index_kind': get_index_kind(index),
+            'storage': get_index_storage(index),
+            'size_bytes': os.path.getsize(self.get_index_path(user_id))
         }
 
 # Global vector store instance
@@ -169,9 +555,13 @@ def build_index_for_user(user_id):
     """Build FAISS index for a specific user."""
     return vector_store.create_index(user_id)
 
-def search_user_entries(user_id, query, top_k=5):
-    """Search a user's entries using vector similarity."""
-    return vector_store.search(user_id, query, top_k)
+def search_user_entries(user_id, query, top_k=5, start_date=None, end_date=None):
+    """Search a user's entries using vector similarity, optionally within a date range."""
+    return vector_store.search(user_id, query, top_k, start_date, end_date)
+
+def add_chunks_to_user_index(user_id, new_chunks):
+    """Incrementally add new chunks to a user's FAISS index."""
+    return vector_store.add_chunks(user_id, new_chunks)
 
 def update_user_index(user_id):
     """Update a user's FAISS index."""
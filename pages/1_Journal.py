@@ -1,10 +1,7 @@
 import streamlit as st
-from modules import database, query_logic, llm_handler
+from modules import database, query_logic, llm_handler, embeddings, chunking
+from modules.answer_cache import answer_cache
 from datetime import datetime, timedelta, date
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
-import faiss
-import numpy as np
 import os
 import sys
 
@@ -20,6 +17,43 @@ if not st.session_state.get("authentication_status"):
 st.sidebar.title(f"Welcome, {st.session_state.name}!")
 user_id = st.session_state.user_id
 
+@st.cache_resource
+def warm_up_model():
+    """Start loading the embedding model once per process, not on every rerun."""
+    return embeddings.warm_up(background=True)
+
+# Load the embedding model while the user is still typing
+warm_up_model()
+
+def page_cursor(key):
+    """Cursor of the page currently shown for a paginated list."""
+    return st.session_state.setdefault(key, [None])[-1]
+
+def pager(key, next_cursor):
+    """Newer/Older buttons that move one page through a paginated list."""
+    cursors = st.session_state[key]
+    newer, older = st.columns(2)
+    if newer.button("← Newer", key=f"{key}_newer", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if older.button("Older →", key=f"{key}_older", disabled=next_cursor is None):
+        cursors.append(next_cursor)
+        st.rerun()
+
+def show_index_status():
+    """Whether the most recently saved entry has reached the search index yet."""
+    job = database.get_latest_index_job(user_id)
+    if not job:
+        return
+    day = job['entry_date'].strftime('%B %d, %Y')
+    if job['status'] == 'done':
+        st.caption(f"✅ Your latest entry ({day}) is indexed and searchable.")
+    elif job['status'] == 'failed':
+        st.caption(f"⚠️ Your latest entry ({day}) could not be indexed, so answers will not include it yet.")
+    else:
+        st.caption(f"⏳ Your latest entry ({day}) is waiting to be indexed.")
+        st.button("Refresh status")
+
 # Main App Logic
 st.title("Journal Dashboard")
 
@@ -31,67 +65,63 @@ with tab1:
     content = st.text_area("How was your day?", height=300)
     if st.button("Save Entry"):
         if content.strip():
-            with st.spinner("Saving and indexing..."):
-                entry_id = database.save_daily_entry(user_id, entry_date, content)
+            with st.spinner("Saving..."):
+                # The index worker adds the chunks to the FAISS index in the background
+                chunks = chunking.split_entry(content)
+                entry_id = database.ingest_entry(user_id, entry_date, content, chunks)
                 if entry_id:
-                    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-                    chunks = splitter.split_text(content)
-                    database.save_entry_chunks(user_id, entry_id, entry_date, chunks)
-                    
-                    # Update FAISS index for the user
-                    all_chunks = database.get_all_chunks(user_id)
-                    if all_chunks:
-                        model = SentenceTransformer('all-MiniLM-L6-v2')
-                        embeddings = model.encode([c['chunk_text'] for c in all_chunks])
-                        index = faiss.IndexFlatL2(embeddings.shape[1])
-                        index.add(np.array(embeddings, dtype=np.float32))
-                        faiss.write_index(index, query_logic.get_faiss_index_path(user_id))
-                    st.success("Entry saved and indexed!")
+                    answer_cache.invalidate_user(user_id)
+                    st.success("Entry saved! It will be searchable once it has been indexed.")
                 else:
                     st.error("Failed to save entry.")
         else:
             st.warning("Please write something.")
+    show_index_status()
 
 with tab2:
     st.header("Query Your Journal")
     query = st.text_input("Ask something...", placeholder="How was my week? or What did I do on my birthday?")
-    start_date = st.date_input("Start Date (for summaries)", date.today() - timedelta(days=7))
-    end_date = st.date_input("End Date (for summaries)", date.today())
+    st.caption("Answers and summaries only use entries between these dates.")
+    start_date = st.date_input("Start Date", date.today() - timedelta(days=7))
+    end_date = st.date_input("End Date", date.today())
     if st.button("Get Answer"):
         if query:
-            with st.spinner("Thinking..."):
-                response = query_logic.handle_query(user_id, query, start_date, end_date)
-                st.markdown(response)
-                database.save_chat_history(user_id, query, response)
+            # Render the answer as it streams; the full text is saved once complete
+            response = st.write_stream(query_logic.handle_query_stream(user_id, query, start_date, end_date))
+            st.caption(f"Based on entries from {start_date} to {end_date}.")
+            database.save_chat_history(user_id, query, response)
         else:
             st.warning("Please enter a query.")
 
 with tab3:
     st.header("All Your Entries")
-    all_entries = database.get_all_entries(user_id)
-    if not all_entries:
+    entries, next_cursor = database.get_entries_page(user_id, cursor=page_cursor("entries_cursors"))
+    if not entries:
         st.info("You have no entries yet.")
     else:
-        for entry in all_entries:
+        for entry in entries:
             with st.expander(f"{entry['entry_date'].strftime('%A, %B %d, %Y')}"):
                 st.write(entry['content'])
+        pager("entries_cursors", next_cursor)
 
 with tab4:
     st.header("AI-Generated Summaries")
     st.subheader("Weekly Summaries")
-    weekly_summaries = database.get_weekly_summaries(user_id)
+    weekly_summaries, next_cursor = database.get_summaries_page('weekly', user_id, cursor=page_cursor("weekly_cursors"))
     if not weekly_summaries:
         st.info("No weekly summaries yet.")
     else:
         for summary in weekly_summaries:
             with st.expander(f"Week of {summary['start_date']}"):
                 st.write(summary['summary'])
+        pager("weekly_cursors", next_cursor)
 
     st.subheader("Monthly Summaries")
-    monthly_summaries = database.get_monthly_summaries(user_id)
+    monthly_summaries, next_cursor = database.get_summaries_page('monthly', user_id, cursor=page_cursor("monthly_cursors"))
     if not monthly_summaries:
         st.info("No monthly summaries yet.")
     else:
         for summary in monthly_summaries:
             with st.expander(f"Month of {summary['start_date'].strftime('%B %Y')}"):
                 st.write(summary['summary'])
+        pager("monthly_cursors", next_cursor)
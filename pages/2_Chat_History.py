@@ -19,12 +19,12 @@ st.title("📜 Chat History")
 st.write("Here are your past conversations with your AI journal assistant.")
 
 try:
-    full_history = database.get_chat_history(user_id)
+    has_history, _ = database.get_chat_history_page(user_id, limit=1)
 except Exception as e:
     st.error(f"Could not retrieve chat history. Error: {e}")
     st.stop()
 
-if not full_history:
+if not has_history:
     st.info("You have no chat history yet. Go to the 'Journal' page to ask a question.")
     st.stop()
 
@@ -39,26 +39,22 @@ with col2:
     st.subheader("🔍 Search within history")
     search_term = st.text_input("Enter a keyword to search for in queries or responses:")
 
-# --- Apply Filters ---
-filtered_history = full_history
-
-if start_date and end_date:
-    if start_date > end_date:
-        st.error("Start date cannot be after end date.")
-    else:
-        start_datetime = datetime.combine(start_date, datetime.min.time())
-        end_datetime = datetime.combine(end_date, datetime.max.time())
-        filtered_history = [
-            item for item in full_history 
-            if start_datetime <= item['timestamp'] <= end_datetime
-        ]
-
-if search_term:
-    search_term_lower = search_term.lower()
-    filtered_history = [
-        item for item in filtered_history
-        if search_term_lower in item['query'].lower() or search_term_lower in item['response'].lower()
-    ]
+if start_date and end_date and start_date > end_date:
+    st.error("Start date cannot be after end date.")
+    st.stop()
+
+start_datetime = datetime.combine(start_date, datetime.min.time()) if start_date else None
+end_datetime = datetime.combine(end_date, datetime.max.time()) if end_date else None
+
+# Changing a filter starts again from the newest page
+filters = (start_date, end_date, search_term)
+if st.session_state.get("chat_history_filters") != filters:
+    st.session_state.chat_history_filters = filters
+    st.session_state.chat_history_cursors = [None]
+cursors = st.session_state.chat_history_cursors
+
+# --- Load One Page of Matching History ---
+filtered_history, next_cursor = database.search_chat_history(user_id, start_datetime, end_datetime, search_term, cursor=cursors[-1])
 
 # --- Display Filtered History ---
 st.markdown("---")
@@ -73,3 +69,11 @@ else:
             st.info(f"**AI answered:** {item['response']}")
             st.caption(f"On: {item['timestamp'].strftime('%Y-%m-%d %H:%M')}")
             st.markdown("---")
+
+newer, older = st.columns(2)
+if newer.button("← Newer", disabled=len(cursors) == 1):
+    cursors.pop()
+    st.rerun()
+if older.button("Older →", disabled=next_cursor is None):
+    cursors.append(next_cursor)
+    st.rerun()
@@ -0,0 +1,115 @@
+import sys
+import os
+import argparse
+import json
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules import embedding_cache, embeddings, vector_store
+from modules.embeddings import MODEL_NAME
+import faiss
+import numpy as np
+
+def synthetic_vectors(num_vectors, dim=384, num_topics=200, seed=0):
+    """Unit vectors drawn around topic centroids, resembling sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(num_topics, dim)).astype(np.float32)
+    topics = rng.integers(0, num_topics, size=num_vectors)
+    vectors = centroids[topics] + 0.6 * rng.normal(size=(num_vectors, dim)).astype(np.float32)
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def user_vectors(user_id):
+    """A real user's chunk embeddings, read from the embedding cache."""
+    model = embeddings.get_model(MODEL_NAME)
+    if model is None:
+        return None
+    _, vectors = embedding_cache.embed_user_chunks(model, MODEL_NAME, user_id)
+    return vectors
+
+def index_size(index):
+    return len(faiss.serialize_index(index))
+
+def measure(index, queries, top_k):
+    """Search one query at a time, as handle_query does, and time each call."""
+    labels = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        _, found = index.search(query.reshape(1, -1), top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        labels.append(found[0])
+    return np.array(labels), np.array(latencies)
+
+def recall_at_k(labels, truth):
+    hits = sum(len(set(found) & set(expected)) for found, expected in zip(labels, truth))
+    return hits / truth.size
+
+def run_report(vectors, num_queries=200, top_k=5, seed=1):
+    """Compare every index kind against the exact flat baseline."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(len(vectors), dtype=np.int64)
+    query_rows = rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)
+    # Perturb stored vectors so queries are near, but not identical to, a chunk
+    queries = vectors[query_rows] + 0.05 * rng.normal(size=(len(query_rows), vectors.shape[1])).astype(np.float32)
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+    results = []
+    truth = None
+    for kind in vector_store.INDEX_KINDS:
+        if kind == 'ivfpq' and len(vectors) < 256 * 39:
+            continue  # too few vectors to train the product quantizer
+        start = time.perf_counter()
+        index = vector_store.vector_store.build_index(vectors, ids, kind=kind)
+        build_seconds = time.perf_counter() - start
+        labels, latencies = measure(index, queries, top_k)
+        if truth is None:
+            truth = labels
+        results.append({
+            'kind': kind,
+            'num_vectors': len(vectors),
+            'build_seconds': round(build_seconds, 3),
+            f'recall_at_{top_k}': round(recall_at_k(labels, truth), 4),
+            'mean_ms': round(float(latencies.mean()), 4),
+            'p95_ms': round(float(np.percentile(latencies, 95)), 4),
+            'index_bytes': index_size(index),
+        })
+    return results
+
+def print_table(results, top_k):
+    print(f"{'kind':<6} {'vectors':>8} {'build s':>8} {'recall@' + str(top_k):>9} {'mean ms':>8} {'p95 ms':>8} {'size MB':>8}")
+    for row in results:
+        print(f"{row['kind']:<6} {row['num_vectors']:>8} {row['build_seconds']:>8.2f} {row[f'recall_at_{top_k}']:>9.3f} "
+              f"{row['mean_ms']:>8.3f} {row['p95_ms']:>8.3f} {row['index_bytes'] / 1e6:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall vs latency of each FAISS index kind against the flat baseline.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--user-id", type=int, help="Use a user's cached chunk embeddings")
+    source.add_argument("--synthetic", type=int, nargs='+', metavar="N", help="Use N synthetic vectors (one report per N)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    if args.user_id is not None:
+        vectors = user_vectors(args.user_id)
+        if vectors is None or len(vectors) == 0:
+            print(f"No embeddings found for user {args.user_id}.")
+            return
+        datasets = [vectors]
+    else:
+        datasets = [synthetic_vectors(n) for n in args.synthetic]
+
+    all_results = []
+    for vectors in datasets:
+        results = run_report(vectors, args.queries, args.top_k)
+        print_table(results, args.top_k)
+        print()
+        all_results.extend(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(all_results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,84 @@
 import sys
 import os
+import argparse
+import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from modules import database, query_logic
-from sentence_transformers import SentenceTransformer
-import faiss
+from modules import database, embedding_cache, embedding_engine, vector_store
+from modules.embeddings import MODEL_NAME
 import numpy as np
 
-def build_all_indexes():
+def user_jobs(users, pending):
+    """Yield (user_id, texts to encode) per user, keeping their chunks in `pending`.
+
+    Cached vectors are reused, so only new or edited chunks are sent to the
+    embedding engine.
+    """
+    for user in users:
+        user_id = user['id']
+        rows = database.get_chunks_with_embeddings(user_id, MODEL_NAME)
+        if not rows:
+            print(f"  - No chunks found for user {user_id}. Skipping.")
+            continue
+        chunks = [{'id': row['id'], 'entry_date': row['entry_date'], 'chunk_text': row['chunk_text']} for row in rows]
+        hashes, vectors, missing = embedding_cache.split_cached(chunks, {row['id']: row for row in rows})
+        pending[user_id] = (chunks, hashes, vectors, missing)
+        yield user_id, [chunks[i]['chunk_text'] for i in missing]
+
+def write_index(user_id, chunks, vectors):
+    """Build and save one user's index and dates sidecar.
+
+    The index worker may have appended entries since the chunks were read,
+    so under the user's index lock anything missing is added after the save.
+    """
+    store = vector_store.vector_store
+    chunk_ids = np.array([chunk['id'] for chunk in chunks], dtype=np.int64)
+    index = store.build_index(vectors, chunk_ids)
+    with database.user_index_lock(user_id) as locked:
+        if not locked:
+            print(f"  - User {user_id}: index is locked by another process, skipping")
+            return False
+        if not store.save_index(index, user_id):
+            return False
+        store.save_dates(user_id, chunk_ids, vector_store.day_numbers([chunk['entry_date'] for chunk in chunks]))
+        store.add_missing_chunks(user_id)
+    print(f"  - User {user_id}: saved {vector_store.get_index_kind(index)} index with {len(chunks)} vectors to {store.get_index_path(user_id)}")
+    return True
+
+def build_all_indexes(workers=None, batch_size=None, user_ids=None):
     print("Fetching all users...")
     users = database.get_all_users()
+    if user_ids:
+        users = [user for user in users if user['id'] in set(user_ids)]
     if not users:
         print("No users found.")
         return
 
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-    print(f"Found {len(users)} users. Building indexes...")
+    workers = workers or embedding_engine.EMBED_WORKERS
+    batch_size = batch_size or embedding_engine.EMBED_BATCH_SIZE
+    print(f"Found {len(users)} users. Embedding with {workers} workers in batches of {batch_size}...")
 
-    for user in users:
-        user_id = user['id']
-        print(f"  - Building index for user_id: {user_id} ({user['username']})")
-        chunks = database.get_all_chunks(user_id)
-        
-        if not chunks:
-            print(f"    - No chunks found for user {user_id}. Skipping.")
-            continue
-            
-        chunk_texts = [chunk['chunk_text'] for chunk in chunks]
-        embeddings = model.encode(chunk_texts)
-        
-        index = faiss.IndexFlatL2(embeddings.shape[1])
-        index.add(np.array(embeddings, dtype=np.float32))
-        
-        index_file = query_logic.get_faiss_index_path(user_id)
-        faiss.write_index(index, index_file)
-        print(f"    - Successfully built and saved index to {index_file}")
+    started = time.monotonic()
+    pending = {}
+    encoded_total = built = 0
+    with embedding_engine.EmbeddingEngine(MODEL_NAME, workers=workers, batch_size=batch_size) as engine:
+        for user_id, encoded in engine.embed(user_jobs(users, pending)):
+            chunks, hashes, vectors, missing = pending.pop(user_id)
+            vectors = embedding_cache.fill_missing(MODEL_NAME, chunks, hashes, vectors, missing, encoded)
+            encoded_total += len(missing)
+            built += write_index(user_id, chunks, vectors)
+
+    elapsed = time.monotonic() - started
+    rate = f" ({encoded_total / elapsed:,.0f} chunks/s)" if elapsed > 0 else ""
+    print(f"Done. Built {built} indexes and encoded {encoded_total} chunks in {elapsed:.1f}s{rate}.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build FAISS indexes for all users.")
+    parser.add_argument("--workers", type=int, help="Embedding processes (defaults to EMBED_WORKERS, 2)")
+    parser.add_argument("--batch-size", type=int, help="Chunks per encode call (defaults to EMBED_BATCH_SIZE)")
+    parser.add_argument("--user-id", type=int, nargs='+', help="Only build these users")
+    args = parser.parse_args()
+    build_all_indexes(args.workers, args.batch_size, args.user_id)
 
 if __name__ == "__main__":
-    build_all_indexes()
\ No newline at end of file
+    main()
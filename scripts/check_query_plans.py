@@ -0,0 +1,125 @@
+import sys
+import os
+import argparse
+from datetime import date, timedelta
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules import database
+
+# Queries that read a whole table on purpose
+EXPECTED_FULL_SCANS = {'get_all_users'}
+
+class ExplainCursor:
+    """Cursor wrapper that EXPLAINs every SELECT before running it."""
+
+    def __init__(self, conn, cursor, plans):
+        self._conn = conn
+        self._cursor = cursor
+        self._plans = plans
+
+    def execute(self, query, params=None):
+        if query.lstrip(' (').upper().startswith('SELECT'):
+            explain = self._conn.cursor(dictionary=True)
+            try:
+                explain.execute("EXPLAIN " + query, params)
+                self._plans.append((query, explain.fetchall()))
+            finally:
+                explain.close()
+        return self._cursor.execute(query, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class ExplainConnection:
+    def __init__(self, conn, plans):
+        self._conn = conn
+        self._plans = plans
+
+    def cursor(self, *args, **kwargs):
+        return ExplainCursor(self._conn, self._conn.cursor(*args, **kwargs), self._plans)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def read_queries(user_id, start_date, end_date):
+    """(name, call) for every read function in modules.database."""
+    return [
+        ('get_user', lambda: database.get_user('explain-check')),
+        ('get_user_by_email', lambda: database.get_user_by_email('explain-check@example.com')),
+        ('get_all_users', lambda: database.get_all_users()),
+        ('get_entry_chunks', lambda: database.get_entry_chunks(user_id, 1)),
+        ('get_all_chunks', lambda: database.get_all_chunks(user_id)),
+        ('get_chunks_page', lambda: database.get_chunks_page(user_id, after_id=1000)),
+        ('get_chunks_with_embeddings', lambda: database.get_chunks_with_embeddings(user_id, 'all-MiniLM-L6-v2')),
+        ('get_chunk_dates', lambda: database.get_chunk_dates(user_id)),
+        ('get_chunk_embeddings', lambda: database.get_chunk_embeddings([1, 2, 3], 'all-MiniLM-L6-v2')),
+        ('get_chunk_rows_by_ids', lambda: database.get_chunk_rows_by_ids(user_id, [1, 2, 3])),
+        ('get_chunks_for_entries', lambda: database.get_chunks_for_entries(user_id, [1, 2, 3])),
+        ('get_chunks_for_dates', lambda: database.get_chunks_for_dates(user_id, [start_date, end_date])),
+        ('get_summary_context_rows', lambda: database.get_summary_context_rows(user_id, start_date, end_date)),
+        ('get_all_entries', lambda: database.get_all_entries(user_id)),
+        ('get_entries_page', lambda: database.get_entries_page(user_id, cursor=(end_date, 1000))),
+        ('get_entries_in_range', lambda: database.get_entries_in_range(user_id, start_date, end_date)),
+        ('get_user_data_version', lambda: database.get_user_data_version(user_id)),
+        ('get_latest_index_job', lambda: database.get_latest_index_job(user_id)),
+        ('get_entry_dates', lambda: database.get_entry_dates(user_id)),
+        ('get_summarized_periods', lambda: database.get_summarized_periods('weekly', start_date, end_date)),
+        ('get_weekly_summaries', lambda: database.get_weekly_summaries(user_id)),
+        ('get_monthly_summaries', lambda: database.get_monthly_summaries(user_id)),
+        ('get_summaries_page', lambda: database.get_summaries_page('weekly', user_id, cursor=(end_date, end_date))),
+        ('get_weekly_summaries_in_range', lambda: database.get_weekly_summaries_in_range(user_id, start_date, end_date)),
+        ('get_monthly_summaries_in_range', lambda: database.get_monthly_summaries_in_range(user_id, start_date, end_date)),
+        ('get_chat_history', lambda: database.get_chat_history(user_id)),
+        ('search_chat_history', lambda: database.search_chat_history(user_id, start_date, end_date, 'journal')),
+        ('get_chat_history_page', lambda: database.get_chat_history_page(user_id, start_time=start_date, cursor=(end_date, 1000))),
+    ]
+
+def plan_problems(rows):
+    """Plan rows that read a real table without an index."""
+    problems = []
+    for row in rows:
+        table = row.get('table')
+        # Derived and union results, or no table at all (e.g. an impossible WHERE)
+        if not table or table.startswith('<'):
+            continue
+        if row.get('type') == 'ALL' or row.get('key') is None:
+            problems.append(f"{table}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN every read query and flag full table scans.")
+    parser.add_argument("--user-id", type=int, default=1, help="User id to run the queries for")
+    parser.add_argument("--days", type=int, default=30, help="Length of the sample date range")
+    args = parser.parse_args()
+
+    end_date = date.today()
+    start_date = end_date - timedelta(days=args.days)
+    get_connection = database.get_db_connection
+    failures = 0
+    for name, call in read_queries(args.user_id, start_date, end_date):
+        plans = []
+        def explained_connection():
+            conn = get_connection()
+            return ExplainConnection(conn, plans) if conn else None
+        database.get_db_connection = explained_connection
+        try:
+            call()
+        finally:
+            database.get_db_connection = get_connection
+        if not plans:
+            print(f"  ? {name}: no query captured")
+            continue
+        problems = [problem for _, rows in plans for problem in plan_problems(rows)]
+        if problems and name not in EXPECTED_FULL_SCANS:
+            failures += 1
+            print(f"  x {name}")
+            for problem in problems:
+                print(f"      {problem}")
+        else:
+            print(f"  ok {name}")
+
+    print(f"Done. {failures} quer{'y' if failures == 1 else 'ies'} without a usable index.")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
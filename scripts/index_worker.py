@@ -0,0 +1,77 @@
+import sys
+import os
+import argparse
+import time
+from collections import defaultdict
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules import database, vector_store
+
+def jobs_by_user(jobs):
+    """Group claimed jobs by user, so each user's index is updated once per batch."""
+    grouped = defaultdict(list)
+    for job in jobs:
+        grouped[job['user_id']].append(job)
+    return grouped
+
+def index_user_jobs(store, user_id, jobs):
+    """Add the chunks of every job's entry to the user's index, then record the outcome."""
+    job_ids = [job['id'] for job in jobs]
+    entry_ids = sorted({job['entry_id'] for job in jobs})
+    started = time.monotonic()
+    try:
+        # Another worker or a build script may be writing this user's index
+        with database.user_index_lock(user_id) as locked:
+            if not locked:
+                raise RuntimeError("timed out waiting for the index lock")
+            chunks = database.get_chunks_for_entries(user_id, entry_ids)
+            if chunks is None:
+                raise RuntimeError("database unavailable")
+            # add_chunks skips chunks already in the index, so a retried job is harmless
+            if chunks and not store.add_chunks(user_id, chunks):
+                raise RuntimeError("index update failed")
+            database.complete_index_jobs(job_ids)
+    except Exception as e:
+        print(f"  - User {user_id}: {len(entry_ids)} entries failed: {e}")
+        database.fail_index_jobs(job_ids, e)
+        return False
+    print(f"  - User {user_id}: {len(entry_ids)} entries, {len(chunks)} chunks indexed in {time.monotonic() - started:.2f}s")
+    return True
+
+def drain(store, batch_size):
+    """Process jobs until the queue is empty; returns the number of jobs claimed."""
+    processed = 0
+    while True:
+        jobs = database.claim_index_jobs(batch_size)
+        if not jobs:
+            return processed
+        for user_id, user_jobs in jobs_by_user(jobs).items():
+            index_user_jobs(store, user_id, user_jobs)
+        processed += len(jobs)
+
+def main():
+    parser = argparse.ArgumentParser(description="Add newly saved entries to the FAISS indexes from the index_jobs queue.")
+    parser.add_argument("--once", action="store_true", help="Exit when the queue is empty instead of polling")
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds to wait between polls of an empty queue")
+    parser.add_argument("--batch-size", type=int, default=100, help="Jobs claimed per round")
+    args = parser.parse_args()
+
+    store = vector_store.get_vector_store()
+    if not store.model:
+        print("Embedding model not available.")
+        return
+    print(f"Index worker started; polling every {args.interval}s.")
+    try:
+        while True:
+            processed = drain(store, args.batch_size)
+            if processed:
+                print(f"Processed {processed} jobs.")
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        # Jobs claimed but not finished are picked up again after INDEX_JOB_STALE_SECONDS
+        print("Stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import sys
+import os
+import argparse
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules import migrations
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply pending SQL migrations from sql/migrations.")
+    parser.add_argument("--status", action="store_true", help="List migrations and whether they are applied")
+    parser.add_argument("--dry-run", action="store_true", help="Show pending migrations without applying them")
+    parser.add_argument("--target", type=int, help="Only apply migrations up to this version")
+    args = parser.parse_args()
+
+    if args.status:
+        rows = migrations.status()
+        if not rows:
+            print("No migrations found, or the database is unreachable.")
+        for version, name, applied in rows:
+            print(f"  {'[x]' if applied else '[ ]'} {version:03d}_{name}")
+        return
+
+    print("Checking for pending migrations...")
+    applied = migrations.migrate(target=args.target, dry_run=args.dry_run)
+    if not applied:
+        print("Database schema is up to date.")
+    else:
+        print(f"Done. {len(applied)} migration(s) {'pending' if args.dry_run else 'applied'}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import sys
+import os
+import argparse
+import glob
+import re
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from modules import database, vector_store
+import faiss
+
+def find_index_user_ids():
+    """User ids of every index file matching FAISS_INDEX_PATH."""
+    pattern = re.compile(re.escape(vector_store.FAISS_INDEX_PATH).replace(r'\{\}', r'(\d+)') + '$')
+    user_ids = []
+    for path in glob.glob(vector_store.FAISS_INDEX_PATH.format('*')):
+        match = pattern.search(path)
+        if match:
+            user_ids.append(int(match.group(1)))
+    return sorted(user_ids)
+
+def migrate_user_index(store, user_id, storage, dry_run=False):
+    """Rewrite one user's index with the target vector storage.
+
+    Legacy positional indexes are rewritten with chunk id labels even when
+    their storage already matches. Exact float32 indexes are re-encoded from their own vectors. Compressed
+    and legacy indexes are rebuilt from the cached float32 embeddings so
+    quantization error does not compound.
+    """
+    index = store.load_index(user_id, use_cache=False)
+    if index is None:
+        print(f"  - User {user_id}: no index, skipping")
+        return False
+    current = vector_store.get_index_storage(index)
+    kind = vector_store.get_index_kind(index)
+    legacy = not isinstance(index, faiss.IndexIDMap)
+    if (current == storage and not legacy) or kind == 'ivfpq':
+        print(f"  - User {user_id}: {kind}/{current} already up to date")
+        return False
+
+    before = os.path.getsize(store.get_index_path(user_id))
+    if dry_run:
+        print(f"  - User {user_id}: would migrate {kind}/{current} ({before / 1e6:.1f} MB) to {storage}")
+        return True
+
+    if current == 'float32' and not legacy:
+        # Read the dates sidecar while it still matches the old index file
+        ids, days = store.load_dates(user_id, index)
+        chunk_ids = faiss.vector_to_array(index.id_map)
+        vectors = faiss.downcast_index(index.index).reconstruct_n(0, index.ntotal)
+        migrated = store.build_index(vectors, chunk_ids, kind=kind, storage=storage)
+        ok = store.save_index(migrated, user_id) and store.save_dates(user_id, ids, days)
+    else:
+        # Rebuilding writes the dates sidecar along with the index
+        ok = store.create_index(user_id, storage=storage)
+
+    if ok:
+        after = os.path.getsize(store.get_index_path(user_id))
+        print(f"  - User {user_id}: {kind}/{current} -> {storage}, {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+    else:
+        print(f"  - User {user_id}: migration failed")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert existing FAISS index files to another vector storage mode.")
+    parser.add_argument("--storage", default=vector_store.VECTOR_STORAGE, choices=vector_store.VECTOR_STORAGES,
+                        help="Target storage (defaults to FAISS_VECTOR_STORAGE)")
+    parser.add_argument("--user-id", type=int, nargs='+', help="Only migrate these users")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    user_ids = args.user_id or find_index_user_ids()
+    if not user_ids:
+        print("No index files found.")
+        return
+
+    print(f"Migrating {len(user_ids)} indexes to {args.storage} storage...")
+    store = vector_store.get_vector_store()
+    migrated = 0
+    for user_id in user_ids:
+        with database.user_index_lock(user_id) as locked:
+            if not locked:
+                print(f"  - User {user_id}: index is locked by another process, skipping")
+                continue
+            migrated += migrate_user_index(store, user_id, args.storage, args.dry_run)
+    print(f"Done. {migrated} of {len(user_ids)} indexes {'would be ' if args.dry_run else ''}migrated.")
+
+if __name__ == "__main__":
+    main()
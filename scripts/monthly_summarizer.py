@@ -1,36 +1,18 @@
 import sys
 import os
-from datetime import date
-from dateutil.relativedelta import relativedelta
+import argparse
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from modules import database, llm_handler
+from modules import summarizer
 
 def main():
-    print("Starting monthly summarization for all users...")
-    users = database.get_all_users()
-    if not users:
-        print("No users found.")
-        return
-        
-    for user in users:
-        user_id = user['id']
-        print(f"  - Generating summary for user {user_id}...")
-        today = date.today()
-        end_date = today.replace(day=1) - relativedelta(days=1)
-        start_date = end_date.replace(day=1)
-
-        entries = database.get_entries_in_range(user_id, start_date, end_date)
-
-        if not entries:
-            print(f"    - No entries found for user {user_id} last month. Skipping.")
-            continue
-
-        full_text = "\n\n".join([f"Date: {entry['entry_date']}\n{entry['content']}" for entry in entries])
-        prompt = f"Perform a comprehensive review of the journal entries from {start_date.strftime('%B %Y')}. Generate a detailed summary covering significant events, recurring themes, and personal growth.\n\nEntries:\n{full_text}\n\nComprehensive Monthly Summary:"
-        
-        summary = llm_handler.get_llm_response(prompt)
-        database.save_monthly_summary(user_id, start_date, end_date, summary)
-        print(f"    - Successfully generated summary for user {user_id}.")
+    parser = argparse.ArgumentParser(description="Generate monthly summaries for all users.")
+    parser.add_argument("--workers", type=int, default=summarizer.SUMMARIZER_WORKERS, help="Concurrent LLM requests")
+    parser.add_argument("--backfill", action="store_true", help="Also summarize every earlier period that has entries but no summary")
+    parser.add_argument("--user-id", type=int, nargs='+', help="Only summarize these users")
+    parser.add_argument("--mode", choices=summarizer.MONTHLY_SUMMARY_MODES, default=summarizer.MONTHLY_SUMMARY_MODE,
+                        help="Build from weekly summaries and digests, or from every raw entry")
+    args = parser.parse_args()
+    summarizer.run('monthly', backfill=args.backfill, workers=args.workers, user_ids=args.user_id, monthly_mode=args.mode)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
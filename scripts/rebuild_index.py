@@ -1,63 +1,204 @@
 import sys
 import os
-
+import argparse
+import multiprocessing
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from modules import database, vector_store
+from modules import database, chunking, embedding_cache, embeddings, vector_store
+from modules.embeddings import MODEL_NAME
+import numpy as np
+
+STAGES = (('read', 'entries'), ('chunk', 'entries'), ('write', 'chunks'), ('embed', 'chunks'), ('index', 'vectors'))
+
+class StageStats:
+    """Items and wall-clock seconds per pipeline stage."""
+
+    def __init__(self):
+        self.items = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def add(self, stage, items, seconds):
+        self.items[stage] += items
+        self.seconds[stage] += seconds
+
+    def report(self, title):
+        print(title)
+        for stage, unit in STAGES:
+            items, seconds = self.items[stage], self.seconds[stage]
+            rate = f"{items / seconds:,.0f} {unit}/s" if seconds > 0 else "-"
+            print(f"    {stage:<6} {items:>9,} {unit:<8} {seconds:8.1f}s  {rate}")
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def timed(iterable, stats, stage, count=len):
+    """Yield from `iterable`, charging the time spent producing each item to `stage`."""
+    iterator = iter(iterable)
+    while True:
+        started = time.monotonic()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        stats.add(stage, count(item), time.monotonic() - started)
+        yield item
+
+def chunk_batches(user_id, pool, batch_size, max_pending, stats):
+    """Yield lists of (entry_id, entry_date, chunk_text) for a user's entries.
+
+    Entries are streamed from MySQL in batches and chunked in the process
+    pool; up to `max_pending` batches are in flight while earlier results are
+    written, so memory stays bounded however large the journal is.
+    """
+    entries = timed(batched(database.iter_entries(user_id, batch_size=batch_size), batch_size), stats, 'read')
+    pending = deque()
+    for batch in entries:
+        pending.append((len(batch), pool.submit(chunking.split_entries, [(e['id'], e['entry_date'], e['content']) for e in batch])))
+        if len(pending) >= max_pending:
+            yield wait_for(pending.popleft(), stats)
+    while pending:
+        yield wait_for(pending.popleft(), stats)
+
+def wait_for(pending, stats):
+    num_entries, future = pending
+    started = time.monotonic()
+    rows = future.result()
+    stats.add('chunk', num_entries, time.monotonic() - started)
+    return rows
+
+def rechunk_user(user_id, pool, batch_size, max_pending, stats):
+    """Replace a user's chunks in one transaction; returns the chunk count or None."""
+    batches = chunk_batches(user_id, pool, batch_size, max_pending, stats)
+    started = time.monotonic()
+    before = stats.seconds['read'] + stats.seconds['chunk']
+    inserted = database.replace_user_chunks(user_id, batches)
+    # Time not spent reading or chunking was spent writing
+    upstream = stats.seconds['read'] + stats.seconds['chunk'] - before
+    stats.add('write', inserted or 0, time.monotonic() - started - upstream)
+    return inserted
 
-def rebuild_all_user_indexes():
-    """Rebuild FAISS indexes for all users."""
-    print("Starting the index rebuilding process for all users...")
-    
-    # Get all users
-    users = database.get_all_users()
+def index_user(store, model, user_id, num_chunks, batch_size, stats):
+    """Embed a user's chunks batch by batch and build their index.
+
+    Only the vectors still waiting for training (IVF-PQ and int8 indexes)
+    are buffered; the rest go straight into the index.
+    """
+    index = store.new_index(num_chunks)
+    train_size = min(num_chunks, vector_store.IVF_TRAIN_SAMPLE)
+    buffered = []
+    ids, days = [], []
+
+    def add(vectors, chunk_ids):
+        started = time.monotonic()
+        index.add_with_ids(vectors, chunk_ids)
+        stats.add('index', len(chunk_ids), time.monotonic() - started)
+
+    for rows in batched(database.iter_chunks(user_id, batch_size), batch_size):
+        started = time.monotonic()
+        vectors = embedding_cache.embed_chunks(model, store.model_name, rows)
+        stats.add('embed', len(rows), time.monotonic() - started)
+        chunk_ids = np.array([row['id'] for row in rows], dtype=np.int64)
+        ids.append(chunk_ids)
+        days.append(vector_store.day_numbers([row['entry_date'] for row in rows]))
+        if index.is_trained:
+            add(vectors, chunk_ids)
+            continue
+        buffered.append((vectors, chunk_ids))
+        if sum(len(batch_ids) for _, batch_ids in buffered) >= train_size:
+            index.train(np.vstack([batch for batch, _ in buffered])[:train_size])
+            for batch, batch_ids in buffered:
+                add(batch, batch_ids)
+            buffered = []
+
+    if not ids:
+        return False
+    if buffered:
+        index.train(np.vstack([batch for batch, _ in buffered]))
+        for batch, batch_ids in buffered:
+            add(batch, batch_ids)
+    if not store.save_index(index, user_id):
+        return False
+    store.save_dates(user_id, np.concatenate(ids), np.concatenate(days))
+    return True
+
+def rebuild_user(store, model, user, pool, args, stats):
+    user_id = user['id']
+    print(f"  - User {user_id} ({user['username']})")
+    num_chunks = rechunk_user(user_id, pool, args.batch_size, args.workers * 2, stats)
+    if num_chunks is None:
+        print("    Failed to replace chunks; the previous chunks and index are unchanged")
+        return False
+    if num_chunks == 0:
+        store.delete_user_index(user_id)
+        print("    No entries; index removed")
+        return True
+    if index_user(store, model, user_id, num_chunks, args.embed_batch_size, stats):
+        print(f"    {num_chunks:,} chunks indexed")
+        return True
+    print("    Failed to build the index")
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-chunk every entry and rebuild the FAISS indexes.")
+    parser.add_argument("--user-id", type=int, nargs='+', help="Only rebuild these users")
+    parser.add_argument("--resume-from", type=int, help="Skip users with a lower id, e.g. to continue an interrupted run")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Chunking processes")
+    parser.add_argument("--batch-size", type=int, default=200, help="Entries read and chunked per batch")
+    parser.add_argument("--embed-batch-size", type=int, default=1000, help="Chunks embedded and indexed per batch")
+    args = parser.parse_args()
+
+    users = sorted(database.get_all_users(), key=lambda user: user['id'])
+    if args.user_id:
+        users = [user for user in users if user['id'] in set(args.user_id)]
+    if args.resume_from is not None:
+        users = [user for user in users if user['id'] >= args.resume_from]
     if not users:
-        print("No users found in the database. Exiting.")
+        print("No users to rebuild.")
         return
-    
-    print(f"Found {len(users)} users. Building indexes...")
-    
-    for user in users:
-        user_id = user['id']
-        username = user['username']
-        print(f"\nProcessing user: {username} (ID: {user_id})")
-        
-        # Delete existing index if it exists
-        vector_store.delete_user_index(user_id)
-        
-        # Get user's entries
-        entries = database.get_all_entries(user_id)
-        if not entries:
-            print(f"  No entries found for user {username}")
-            continue
-        
-        print(f"  Found {len(entries)} entries for user {username}")
-        
-        # Process each entry and create chunks
-        for entry in entries:
-            entry_id = entry['id']
-            content = entry['content']
-            
-            # Create chunks for this entry
-            from langchain_text_splitters import RecursiveCharacterTextSplitter
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=500, 
-                chunk_overlap=50,
-                separators=["\n\n", "\n", ". ", "! ", "? ", " ", ""]
-            )
-            chunks = text_splitter.split_text(content)
-            
-            # Save chunks to database
-            database.save_entry_chunks(user_id, entry_id, chunks)
-        
-        # Build the FAISS index for this user
-        success = vector_store.create_index(user_id)
-        if success:
-            print(f"  Successfully built index for user {username}")
-        else:
-            print(f"  Failed to build index for user {username}")
-    
-    print("\nIndex rebuilding process complete!")
+
+    model = embeddings.get_model(MODEL_NAME)
+    if model is None:
+        return
+    store = vector_store.get_vector_store()
+    total = StageStats()
+    print(f"Rebuilding {len(users)} users with {args.workers} chunking workers...")
+    failed = []
+    # Spawned workers inherit neither the loaded model's threads nor pooled MySQL sockets
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for user in users:
+            stats = StageStats()
+            try:
+                # Held for the whole user, so the index worker waits instead of appending to an index about to be replaced
+                with database.user_index_lock(user['id']) as locked:
+                    if not locked:
+                        print(f"  - User {user['id']}: index is locked by another process, skipping")
+                        ok = False
+                    else:
+                        ok = rebuild_user(store, model, user, pool, args, stats)
+            except Exception as e:
+                print(f"    Error: {e}")
+                ok = False
+            if not ok:
+                failed.append(user['id'])
+            stats.report(f"    Throughput for user {user['id']}:")
+            for stage, _ in STAGES:
+                total.add(stage, stats.items[stage], stats.seconds[stage])
+
+    total.report("Total throughput:")
+    if failed:
+        print(f"Failed users: {' '.join(str(user_id) for user_id in failed)}")
+        print(f"Retry them with: python scripts/rebuild_index.py --user-id {' '.join(str(user_id) for user_id in failed)}")
+    print("Index rebuilding process complete!")
 
 if __name__ == "__main__":
-    rebuild_all_user_indexes() 
\ No newline at end of file
+    main()
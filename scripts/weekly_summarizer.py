@@ -1,35 +1,16 @@
 import sys
 import os
-from datetime import date, timedelta
+import argparse
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from modules import database, llm_handler
+from modules import summarizer
 
 def main():
-    print("Starting weekly summarization for all users...")
-    users = database.get_all_users()
-    if not users:
-        print("No users found.")
-        return
-
-    for user in users:
-        user_id = user['id']
-        print(f"  - Generating summary for user {user_id}...")
-        today = date.today()
-        end_date = today - timedelta(days=today.weekday() + 1)
-        start_date = end_date - timedelta(days=6)
-
-        entries = database.get_entries_in_range(user_id, start_date, end_date)
-
-        if not entries:
-            print(f"    - No entries found for user {user_id} last week. Skipping.")
-            continue
-
-        full_text = "\n\n".join([f"Date: {entry['entry_date']}\n{entry['content']}" for entry in entries])
-        prompt = f"Review the following journal entries from the past week and provide a concise summary. Highlight key events, moods, and recurring themes.\n\nEntries:\n{full_text}\n\nWeekly Summary:"
-        
-        summary = llm_handler.get_llm_response(prompt)
-        database.save_weekly_summary(user_id, start_date, end_date, summary)
-        print(f"    - Successfully generated summary for user {user_id}.")
+    parser = argparse.ArgumentParser(description="Generate weekly summaries for all users.")
+    parser.add_argument("--workers", type=int, default=summarizer.SUMMARIZER_WORKERS, help="Concurrent LLM requests")
+    parser.add_argument("--backfill", action="store_true", help="Also summarize every earlier period that has entries but no summary")
+    parser.add_argument("--user-id", type=int, nargs='+', help="Only summarize these users")
+    args = parser.parse_args()
+    summarizer.run('weekly', backfill=args.backfill, workers=args.workers, user_ids=args.user_id)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
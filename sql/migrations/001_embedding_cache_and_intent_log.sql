@@ -0,0 +1,23 @@
+-- Tables added after the baseline schema: the embedding cache and the
+-- intent classifier decision log.
+CREATE TABLE IF NOT EXISTS chunk_embeddings (
+    chunk_id INT NOT NULL,
+    model_name VARCHAR(255) NOT NULL,
+    text_hash CHAR(64) NOT NULL,
+    embedding BLOB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (chunk_id, model_name),
+    FOREIGN KEY (chunk_id) REFERENCES entry_chunks(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS intent_decisions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NULL,
+    query TEXT NOT NULL,
+    local_intent VARCHAR(16) NOT NULL,
+    local_confidence FLOAT NOT NULL,
+    local_method VARCHAR(16) NOT NULL,
+    llm_intent VARCHAR(16) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
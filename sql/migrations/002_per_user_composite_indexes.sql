@@ -0,0 +1,18 @@
+-- Composite indexes matching the per-user access paths in modules/database.py.
+-- Every query filters on user_id first, then a date or timestamp range.
+CREATE INDEX idx_daily_entries_user_date ON daily_entries (user_id, entry_date);
+CREATE INDEX idx_entry_chunks_user_date ON entry_chunks (user_id, entry_date);
+CREATE INDEX idx_chat_history_user_timestamp ON chat_history (user_id, timestamp);
+
+-- One summary per user and period; the summarizers rely on this to resume.
+-- Fails if duplicate summaries exist: remove them, then rerun the migration.
+CREATE UNIQUE INDEX uq_weekly_summaries_period ON weekly_summaries (user_id, start_date, end_date);
+CREATE UNIQUE INDEX uq_monthly_summaries_period ON monthly_summaries (user_id, start_date, end_date);
+
+-- The summarizers look up already-summarized periods across all users
+CREATE INDEX idx_weekly_summaries_start ON weekly_summaries (start_date);
+CREATE INDEX idx_monthly_summaries_start ON monthly_summaries (start_date);
+
+-- No query filters on the date alone; the composite indexes replace these
+DROP INDEX idx_daily_entries_date ON daily_entries;
+DROP INDEX idx_entry_chunks_entry_date ON entry_chunks;
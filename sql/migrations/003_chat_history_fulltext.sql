@@ -0,0 +1,2 @@
+-- Keyword search over past questions and answers (database.search_chat_history)
+ALTER TABLE chat_history ADD FULLTEXT INDEX ft_chat_history_text (query, response);
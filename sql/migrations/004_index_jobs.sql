@@ -0,0 +1,19 @@
+-- Outbox of FAISS index updates. database.ingest_entry adds a job in the same
+-- transaction as the entry, and scripts/index_worker.py drains the queue.
+-- status is 'pending', 'running', 'done' or 'failed'.
+CREATE TABLE IF NOT EXISTS index_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    entry_id INT NOT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'pending',
+    attempts INT NOT NULL DEFAULT 0,
+    last_error TEXT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    claimed_at TIMESTAMP NULL,
+    completed_at TIMESTAMP NULL,
+    INDEX idx_index_jobs_status (status, id),
+    INDEX idx_index_jobs_user (user_id),
+    INDEX idx_index_jobs_user_status (user_id, status),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (entry_id) REFERENCES daily_entries(id) ON DELETE CASCADE
+);
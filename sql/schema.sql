@@ -2,16 +2,9 @@
 CREATE DATABASE IF NOT EXISTS ai_journal;
 USE ai_journal;
 
--- Drop existing tables to ensure a clean slate
-DROP TABLE IF EXISTS chat_history;
-DROP TABLE IF EXISTS monthly_summaries;
-DROP TABLE IF EXISTS weekly_summaries;
-DROP TABLE IF EXISTS entry_chunks;
-DROP TABLE IF EXISTS daily_entries;
-DROP TABLE IF EXISTS users;
-
--- Create the tables with the new schema
-CREATE TABLE users (
+-- Baseline schema. It is safe to re-run and never drops data; later changes
+-- live in sql/migrations and are applied with `python scripts/migrate.py`.
+CREATE TABLE IF NOT EXISTS users (
     id INT AUTO_INCREMENT PRIMARY KEY,
     username VARCHAR(255) UNIQUE NOT NULL,
     email VARCHAR(255) UNIQUE NOT NULL,
@@ -19,27 +12,29 @@ CREATE TABLE users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE daily_entries (
+CREATE TABLE IF NOT EXISTS daily_entries (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
     entry_date DATE NOT NULL,
     content TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_daily_entries_date (entry_date),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
-CREATE TABLE entry_chunks (
+CREATE TABLE IF NOT EXISTS entry_chunks (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
     entry_id INT NOT NULL,
     entry_date DATE NOT NULL,
     chunk_text TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_entry_chunks_entry_date (entry_date),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (entry_id) REFERENCES daily_entries(id) ON DELETE CASCADE
 );
 
-CREATE TABLE weekly_summaries (
+CREATE TABLE IF NOT EXISTS weekly_summaries (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
     start_date DATE NOT NULL,
@@ -49,7 +44,7 @@ CREATE TABLE weekly_summaries (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
-CREATE TABLE monthly_summaries (
+CREATE TABLE IF NOT EXISTS monthly_summaries (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
     start_date DATE NOT NULL,
@@ -59,7 +54,7 @@ CREATE TABLE monthly_summaries (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
-CREATE TABLE chat_history (
+CREATE TABLE IF NOT EXISTS chat_history (
     id INT AUTO_INCREMENT PRIMARY KEY,
     user_id INT NOT NULL,
     query TEXT NOT NULL,
@@ -67,6 +62,3 @@ CREATE TABLE chat_history (
     timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
--- Create indexes for better performance
-CREATE INDEX idx_daily_entries_date ON daily_entries(entry_date);
-CREATE INDEX idx_entry_chunks_entry_date ON entry_chunks(entry_date);